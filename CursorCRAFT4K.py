@@ -1,7 +1,25 @@
 from ursina import *
-from ursina.prefabs.first_person_controller import FirstPersonController
-from ursina import PerlinNoise
+import atexit
 import random
+import sys
+
+from autosave import AutoSaver
+from chunkstreamer import ChunkStreamer, StartupMetrics, default_executor
+from fluids import FluidEngine
+from jobs import CRITICAL, HIGH, LOW, NEXT_FRAME, NORMAL, JobScheduler
+from lighting import LightEngine
+from mobsystem import MobManager
+from pathfinding import FlowField
+from regionfile import WorldStorage
+from voxeldata import BLOCK_NAMES, MOB_TYPES, TOOLS, make_block_registry
+from voxelplayer import GridFirstPersonController
+from voxelnet import DEFAULT_PORT, VoxelClient
+from voxelrender import ChunkRenderer, MobRenderer, camera_frustum
+from voxelworld import CHUNK_HEIGHT, VoxelWorld, block_coords, raycast_blocks
+from worldgen import ChunkGenerator, EndChunkGenerator
+
+# Startup timing starts before the window opens
+startup_metrics = StartupMetrics()
 
 # Initialize Ursina application
 app = Ursina()
@@ -12,8 +30,9 @@ window.fullscreen = False
 # Debug message
 print_on_screen("Game is running", position=(0, 0), scale=2, duration=5)
 
-# Block types with solid colors
-block_types = {
+# Block colors; the block types, tools and their properties are shared with
+# the server in voxeldata
+block_colors = {
     'grass': color.green,
     'dirt': color.brown,
     'stone': color.gray,
@@ -24,226 +43,215 @@ block_types = {
     'end_stone': color.white,
     'obsidian': color.black,
     'bedrock': color.dark_gray,
-    'cobblestone': color.rgb(100, 100, 100)
-}
-
-# Tools and weapons
-tools = {
-    'wooden_pickaxe': {'speed': 2, 'suitable_for': ['stone', 'cobblestone']},
-    'wooden_axe': {'speed': 2, 'suitable_for': ['wood']},
-    'wooden_shovel': {'speed': 2, 'suitable_for': ['dirt', 'grass', 'sand']},
-    'wooden_sword': {'speed': 1, 'damage': 4},
+    'cobblestone': color.rgb(100, 100, 100),
+    'glowstone': color.rgb(255, 220, 120)
 }
 
 # Inventory system
-inventory = {block: 0 for block in block_types}
-inventory.update({tool: 0 for tool in tools})
+inventory = {block: 0 for block in BLOCK_NAMES}
+inventory.update({tool: 0 for tool in TOOLS})
 inventory['wooden_pickaxe'] = 1  # Starting tool
+inventory['glowstone'] = 8  # Starting light sources
+inventory['water'] = 4  # Starting water sources, which flow once placed
 selected_item = 'wooden_pickaxe'
 
-# Terrain parameters
-terrain_size = 20
-block_size = 1
-pnoise = PerlinNoise()
+# Integer block IDs with color, hardness, light, transparency and tool
+# suitability as flat tables; chunks store one byte per block
+block_registry = make_block_registry(block_colors)
+
+# Terrain parameters (radii in chunks)
+spawn_radius = 1
+load_radius = 4
+unload_radius = 6
+autosave_interval = 30  # seconds between background saves
+frame_budget_ms = 8  # scheduled game work (AI, water, remeshing...) allowed per frame
+startup_budget_ms = 200  # spawn-area generation and meshing allowed before the first frame
+world_seed = 1337
+
+# Mining progress keyed by block position, only for the block being mined
+breaking_progress = {}
+
+# Mob colors; their stats are in voxeldata.MOB_TYPES
+mob_colors = {
+    'zombie': color.green,
+    'skeleton': color.white,
+    'enderman': color.black,
+    'ender_dragon': color.purple,
+    'cow': color.brown
+}
+
+# Chunk generation runs on worker processes shared by all dimensions
+worldgen_executor = default_executor()
+
+# Each dimension owns its chunked blocks, chunk meshes and mobs under one root
+# entity, so switching dimensions detaches one root and attaches another
+class Dimension:
+    def __init__(self, name, make_generator, spawn_point, storage=None, load_radius=4, unload_radius=6):
+        self.name = name
+        self.spawn_point = spawn_point
+        self.player_position = spawn_point
+        self.root = Entity(enabled=False)
+        self.world = VoxelWorld(block_registry)
+        self.light_engine = LightEngine(self.world)
+        # Water flows only where an edit disturbed it, at a fixed tick rate
+        self.fluid_engine = FluidEngine(self.world)
+        self.chunk_renderer = ChunkRenderer(
+            self.world, block_registry.colors, parent=self.root, light_engine=self.light_engine
+        )
+        self.chunk_streamer = ChunkStreamer(
+            self.world, self.chunk_renderer, make_generator(self.world),
+            load_radius=load_radius, unload_radius=unload_radius,
+            executor=worldgen_executor, storage=storage
+        )
+        # Mobs live in parallel arrays and are drawn instanced, one call per type;
+        # hostile ones share one flow field toward the player
+        self.flow_field = FlowField(self.world)
+        self.mob_manager = MobManager(MOB_TYPES, flow_field=self.flow_field)
+        self.mob_renderer = MobRenderer(self.mob_manager, mob_colors, parent=self.root)
+
+# Edited overworld chunks are saved to region files; everything else is regenerated from the seed.
+# Saves are snapshotted between jobs and written on a background thread.
+world_storage = WorldStorage('saves/CursorCRAFT4K', CHUNK_HEIGHT)
+autosaver = AutoSaver(world_storage, interval=autosave_interval)
+overworld = Dimension(
+    'overworld', lambda world: ChunkGenerator(world_seed, world.block_ids, world.height),
+    Vec3(0, 25, 0), storage=autosaver, load_radius=load_radius, unload_radius=unload_radius
+)
+the_end = Dimension(
+    'end', lambda world: EndChunkGenerator(world_seed, world.block_ids, world.height),
+    Vec3(0, 5, 0), load_radius=2, unload_radius=3
+)
+dimension = overworld
+dimension.root.enabled = True
+
+# Multiplayer: --connect HOST[:PORT] joins a voxelserver.py, which then owns the
+# overworld's blocks, water and mobs; the End stays single-player
+network = None
+if '--connect' in sys.argv:
+    host, _, port = sys.argv[sys.argv.index('--connect') + 1].partition(':')
+    network = VoxelClient(overworld.world, host, int(port or DEFAULT_PORT), renderer=overworld.chunk_renderer)
+    overworld.chunk_streamer.enabled = False
+    # The server runs the overworld's water and mobs, so ours stop listening to its edits
+    overworld.world.listeners.remove(overworld.fluid_engine)
+    overworld.world.listeners.remove(overworld.flow_field)
+    overworld.spawn_point = Vec3(*network.spawn_point)
+    overworld.mob_renderer = MobRenderer(
+        network.mobs, mob_colors, parent=overworld.root
+    )
+
+def online():
+    return network is not None and dimension is overworld
 
 # Player setup
-player = FirstPersonController()
-player.position = Vec3(0, 25, 0)
+player = GridFirstPersonController(dimension.world)
+player.position = dimension.spawn_point
 player.health = 20
 player.experience = 0
 player.level = 0
 
+# Inventory and player stats are saved alongside the world
+def player_state():
+    return {
+        'inventory': dict(inventory),
+        'health': float(player.health),
+        'experience': int(player.experience),
+        'level': int(player.level),
+    }
+
+saved_state = autosaver.load_state()
+if saved_state:
+    inventory.update(saved_state['inventory'])
+    player.health = saved_state['health']
+    player.experience = saved_state['experience']
+    player.level = saved_state['level']
+
+def save_world(background=True):
+    # A server saves its own world; only the player is saved here then
+    world = None if network else overworld.world
+    return autosaver.save(world, player_state(), background=background)
+
+# Worker threads are gone by the time exit handlers run, so the last save writes in place
+atexit.register(save_world, background=False)
+
 # Sky
 sky = Sky(color=color.cyan)
 
-# Dimension flag
-in_end_dimension = False
+# Game work is spread over frames by a cooperative job scheduler, with its
+# queue depth and budget use shown in the corner
+scheduler = JobScheduler(budget_ms=frame_budget_ms)
+job_readout = Text(text='', position=window.top_left, origin=(-.5, .5), scale=.75)
+# Chunk meshes submitted for drawing after frustum and cave culling, under it
+cull_readout = Text(text='', position=window.top_left + Vec2(0, -.03), origin=(-.5, .5), scale=.75)
 
-# Mob types
-mob_types = {
-    'zombie': {'color': color.green, 'attack_type': 'melee', 'damage': 3, 'health': 10},
-    'skeleton': {'color': color.white, 'attack_type': 'ranged', 'damage': 2, 'health': 10},
-    'enderman': {'color': color.black, 'attack_type': 'melee', 'damage': 4, 'health': 20},
-    'ender_dragon': {'color': color.purple, 'attack_type': 'melee', 'damage': 10, 'health': 100},
-    'cow': {'color': color.brown, 'attack_type': None, 'damage': 0, 'health': 5}
-}
+# Every block edit goes through here, locally or to the server
+def set_world_block(x, y, z, block_type):
+    # Online, edits show at once and go to the server, whose copy wins
+    if online():
+        network.set_block(x, y, z, block_type)
+    else:
+        dimension.world.set_block(x, y, z, block_type)
 
-# Function to create a voxel
 def create_voxel(position, block_type):
-    hardness_values = {
-        'grass': 1, 'dirt': 1, 'stone': 3, 'wood': 2, 'leaves': 1,
-        'water': 0, 'sand': 1, 'end_stone': 3, 'obsidian': 50, 'bedrock': 100,
-        'cobblestone': 3
-    }
-    voxel = Entity(
-        model='cube',
-        color=block_types[block_type],
-        scale=block_size,
-        position=position,
-        collider='box'
-    )
-    voxel.block_type = block_type
-    voxel.hardness = hardness_values[block_type]
-    voxel.breaking_progress = 0
-    return voxel
-
-# Biome generation
-def get_biome(x, z):
-    biome_noise = PerlinNoise()
-    biome_value = biome_noise([x * 0.05, z * 0.05])
-    if biome_value < -0.2:
-        return 'desert'
-    elif biome_value < 0.2:
-        return 'plains'
-    else:
-        return 'forest'
+    x, y, z = block_coords(position)
+    set_world_block(x, y, z, block_type)
+    return x, y, z
+
+def remove_voxel(position):
+    x, y, z = block_coords(position)
+    set_world_block(x, y, z, None)
+    breaking_progress.pop((x, y, z), None)
 
-# Generate terrain with biomes and structures
+# Build the spawn area nearest first within startup_budget_ms so the first
+# frame shows quickly; the rest streams in and meshes over the next frames
 def generate_terrain():
-    for x in range(-terrain_size // 2, terrain_size // 2):
-        for z in range(-terrain_size // 2, terrain_size // 2):
-            biome = get_biome(x, z)
-            if biome == 'desert':
-                height = int((pnoise([x * 0.1, z * 0.1]) + 1) * 5)
-                for y in range(0, height + 1):
-                    if y == height:
-                        create_voxel(Vec3(x, y, z), 'sand')
-                    else:
-                        create_voxel(Vec3(x, y, z), 'stone')
-            elif biome == 'plains':
-                height = int((pnoise([x * 0.1, z * 0.1]) + 1) * 10)
-                for y in range(0, height + 1):
-                    if y == height:
-                        create_voxel(Vec3(x, y, z), 'grass')
-                    elif y >= height - 3:
-                        create_voxel(Vec3(x, y, z), 'dirt')
-                    else:
-                        create_voxel(Vec3(x, y, z), 'stone')
-                # Simple village house
-                if random.random() < 0.01:
-                    for dx in range(3):
-                        for dz in range(3):
-                            create_voxel(Vec3(x + dx, height + 1, z + dz), 'wood')
-                            if dx == 0 or dx == 2 or dz == 0 or dz == 2:
-                                create_voxel(Vec3(x + dx, height + 2, z + dz), 'cobblestone')
-            elif biome == 'forest':
-                height = int((pnoise([x * 0.1, z * 0.1]) + 1) * 10)
-                for y in range(0, height + 1):
-                    if y == height:
-                        create_voxel(Vec3(x, y, z), 'grass')
-                    elif y >= height - 3:
-                        create_voxel(Vec3(x, y, z), 'dirt')
-                    else:
-                        create_voxel(Vec3(x, y, z), 'stone')
-                # Add trees
-                if random.random() < 0.1:
-                    tree_height = random.randint(3, 5)
-                    for ty in range(height + 1, height + 1 + tree_height):
-                        create_voxel(Vec3(x, ty, z), 'wood')
-                    for lx in range(-1, 2):
-                        for lz in range(-1, 2):
-                            for ly in range(tree_height - 1, tree_height + 1):
-                                create_voxel(Vec3(x + lx, height + 1 + ly, z + lz), 'leaves')
-
-# Generate End dimension terrain
-def generate_end_terrain():
-    for x in range(-10, 10):
-        for z in range(-10, 10):
-            if random.random() < 0.1:
-                height = random.randint(1, 5)
-                for y in range(0, height):
-                    create_voxel(Vec3(x, y, z), 'end_stone')
-    # End Portal frame
-    for x in range(-1, 2):
-        for z in range(-1, 2):
-            create_voxel(Vec3(x, 0, z), 'obsidian')
-
-# Mob class
-class Mob(Entity):
-    def __init__(self, position, mob_type):
-        super().__init__(
-            model='cube',
-            color=mob_types[mob_type]['color'],
-            scale=1,
-            position=position
-        )
-        self.mob_type = mob_type
-        self.health = mob_types[mob_type]['health']
-        self.speed = 2 if mob_type != 'ender_dragon' else 4
-        self.direction = Vec3(random.uniform(-1, 1), 0, random.uniform(-1, 1)).normalized()
-        self.wander_timer = random.uniform(1, 3)
-        self.attack_cooldown = 1
-        self.attack_timer = 0
-        self.breeding_cooldown = 0
-
-    def update(self):
-        if self.mob_type == 'ender_dragon':
-            self.position += Vec3(0, 0.1 * sin(time.time()), 0)
-            if distance(self, player) < 10 and self.attack_timer <= 0:
-                player.health -= mob_types[self.mob_type]['damage']
-                self.attack_timer = self.attack_cooldown
-            self.attack_timer -= time.dt
-        elif self.mob_type == 'enderman':
-            if distance(self, player) < 5 and random.random() < 0.01:
-                self.position = Vec3(random.uniform(-10, 10), self.position.y, random.uniform(-10, 10))
-            elif distance(self, player) < 10:
-                direction = (player.position - self.position).normalized()
-                self.position += direction * self.speed * time.dt
-                if distance(self, player) < 1 and self.attack_timer <= 0:
-                    player.health -= mob_types[self.mob_type]['damage']
-                    self.attack_timer = self.attack_cooldown
-            else:
-                self.wander()
-        elif self.mob_type in ['zombie', 'skeleton']:
-            if distance(self, player) < 10:
-                direction = (player.position - self.position).normalized()
-                self.position += direction * self.speed * time.dt
-                if distance(self, player) < 1 and self.attack_timer <= 0:
-                    player.health -= mob_types[self.mob_type]['damage']
-                    self.attack_timer = self.attack_cooldown
-            else:
-                self.wander()
-        elif self.mob_type == 'cow':
-            self.wander()
-            self.breeding_cooldown -= time.dt
-
-        self.attack_timer -= time.dt
-        if self.health <= 0:
-            destroy(self)
-            player.experience += 5
-
-    def wander(self):
-        self.wander_timer -= time.dt
-        if self.wander_timer <= 0:
-            self.direction = Vec3(random.uniform(-1, 1), 0, random.uniform(-1, 1)).normalized()
-            self.wander_timer = random.uniform(1, 3)
-        self.position += self.direction * self.speed * time.dt
+    if network:
+        return
+    start = time.perf_counter()
+    overworld.chunk_streamer.generate_now(player.position, spawn_radius, budget_ms=startup_budget_ms)
+    spent_ms = (time.perf_counter() - start) * 1000
+    overworld.chunk_renderer.refresh(budget_ms=max(startup_budget_ms - spent_ms, 0))
 
 # Spawn initial mobs
-mobs = []
 for _ in range(5):
     mob_type = random.choice(['zombie', 'skeleton', 'cow'])
-    mob = Mob(position=Vec3(random.uniform(-10, 10), 5, random.uniform(-10, 10)), mob_type=mob_type)
-    mobs.append(mob)
-
-# Ender Dragon in End dimension
-ender_dragon = None
-
-# Function to enter End dimension
-def enter_end_dimension():
-    global in_end_dimension, ender_dragon
-    if not in_end_dimension:
-        in_end_dimension = True
-        for entity in scene.entities:
-            if isinstance(entity, Entity) and hasattr(entity, 'block_type'):
-                destroy(entity)
-        generate_end_terrain()
-        ender_dragon = Mob(position=Vec3(0, 10, 0), mob_type='ender_dragon')
-        mobs.append(ender_dragon)
-        player.position = Vec3(0, 5, 0)
-        for _ in range(3):
-            mob = Mob(position=Vec3(random.uniform(-10, 10), 5, random.uniform(-10, 10)), mob_type='enderman')
-            mobs.append(mob)
+    overworld.mob_manager.spawn(mob_type, Vec3(random.uniform(-10, 10), 5, random.uniform(-10, 10)))
+
+# Ender Dragon and endermen wait in the End, whose terrain generates in the background
+the_end.mob_manager.spawn('ender_dragon', Vec3(0, 10, 0))
+for _ in range(3):
+    the_end.mob_manager.spawn('enderman', Vec3(random.uniform(-10, 10), 5, random.uniform(-10, 10)))
+the_end.chunk_streamer.prefetch(the_end.spawn_point)
+
+# Switch dimensions; each keeps its blocks, meshes and mobs while detached.
+# The target's spawn area is built by a job over as many frames as it needs,
+# and the player moves across once it is ready
+switching = None
+
+def switch_dimension(target):
+    global switching
+    if target is dimension or switching:
+        return
+    switching = scheduler.submit(switch_steps(target), HIGH, 'dimension change')
+
+def switch_steps(target):
+    global dimension, switching
+    if network and target is overworld:
+        # The server sends the overworld's chunks; generating them here would fork the worlds
+        x, _, z = block_coords(target.player_position)
+        while network.connected and not target.world.is_loaded(x, z):
+            yield NEXT_FRAME
+    else:
+        yield from target.chunk_streamer.generate_steps(target.player_position, spawn_radius)
+    yield from target.chunk_renderer.remesh_steps()
+    dimension.player_position = player.position
+    dimension.root.enabled = False
+    breaking_progress.clear()
+    dimension = target
+    dimension.root.enabled = True
+    player.world = dimension.world
+    player.position = dimension.player_position
+    player.velocity_y = 0
+    switching = None
 
 # Simple enchanting and brewing placeholders
 def enchant_item():
@@ -259,7 +267,7 @@ def brew_potion():
 
 # Handle user input
 def input(key):
-    global selected_item, in_end_dimension
+    global selected_item
     if key == '1': selected_item = 'grass'
     elif key == '2': selected_item = 'dirt'
     elif key == '3': selected_item = 'stone'
@@ -267,8 +275,12 @@ def input(key):
     elif key == '5': selected_item = 'leaves'
     elif key == '6': selected_item = 'wooden_pickaxe'
     elif key == '7': selected_item = 'wooden_sword'
-    elif key == 'e':  # Enter End dimension
-        enter_end_dimension()
+    elif key == '8': selected_item = 'glowstone'
+    elif key == '9': selected_item = 'water'
+    elif key == 'e':  # Enter or leave End dimension
+        switch_dimension(the_end if dimension is overworld else overworld)
+    elif key == 'f5':  # Save world
+        print_on_screen(f"Saved {save_world()} chunks", position=(0, 0), scale=2, duration=2)
     elif key == 'q' and held_keys['left mouse']:  # Enchant
         enchant_item()
     elif key == 'b' and held_keys['left mouse']:  # Brew
@@ -276,38 +288,39 @@ def input(key):
 
     # Place block
     if key == 'right mouse down' and inventory[selected_item] > 0:
-        hit_info = raycast(camera.position, camera.forward, distance=5)
-        if hit_info.hit:
-            new_pos = hit_info.entity.position + hit_info.normal
-            create_voxel(new_pos, selected_item)
+        hit = raycast_blocks(dimension.world, camera.world_position, camera.forward, max_distance=5)
+        if hit:
+            (x, y, z), (nx, ny, nz) = hit
+            create_voxel((x + nx, y + ny, z + nz), selected_item)
             inventory[selected_item] -= 1
 
     # Breed animals
     if key == 'f' and selected_item == 'grass':
-        for mob in mobs:
-            if mob.mob_type == 'cow' and distance(mob, player) < 3 and mob.breeding_cooldown <= 0:
-                new_cow = Mob(position=mob.position + Vec3(1, 0, 1), mob_type='cow')
-                mobs.append(new_cow)
-                mob.breeding_cooldown = 5
-                break
+        dimension.mob_manager.breed_near(player.position, 'cow', radius=3, cooldown=5)
 
-# Update game state
-def update():
-    # Block breaking logic
+# Per-frame work runs as scheduler jobs within frame_budget_ms; breaking
+# blocks and the survival checks are critical and run even when over budget
+def break_blocks(dt):
+    # Progress is only kept for the block being mined
+    hit = None
     if held_keys['left mouse']:
-        hit_info = raycast(camera.position, camera.forward, distance=5)
-        if hit_info.hit and hasattr(hit_info.entity, 'block_type'):
-            voxel = hit_info.entity
-            tool_speed = tools.get(selected_item, {'speed': 1})['speed']
-            voxel.breaking_progress += tool_speed * time.dt
-            if voxel.breaking_progress >= voxel.hardness:
-                inventory[voxel.block_type] += 1
-                destroy(voxel)
+        hit = raycast_blocks(dimension.world, camera.world_position, camera.forward, max_distance=5)
+    if hit is None or hit[0] not in breaking_progress:
+        breaking_progress.clear()
+    if hit:
+        voxel = hit[0]
+        block = dimension.world.get_block(*voxel)
+        speed = block_registry.mining_speed(selected_item, block)
+        breaking_progress[voxel] = breaking_progress.get(voxel, 0) + speed * dt
+        if breaking_progress[voxel] >= block_registry.hardness[block]:
+            inventory[block_registry.names[block]] += 1
+            remove_voxel(voxel)
 
+def check_player(dt):
     # Player death and hardcore mode simulation
     if player.health <= 0:
         print_on_screen("You died!", position=(0, 0), scale=2, duration=5)
-        player.position = Vec3(0, 25, 0)
+        player.position = dimension.spawn_point
         player.health = 20
 
     # Experience leveling
@@ -315,6 +328,76 @@ def update():
         player.level += 1
         print_on_screen(f"Level up! Level {player.level}", position=(0, 0), scale=2, duration=2)
 
+def stream_chunks():
+    # Finished chunks are added one per step, so a burst of them spreads over frames
+    while True:
+        yield from dimension.chunk_streamer.update_steps(player.position)
+        yield NEXT_FRAME
+
+def sync_server(dt):
+    # Apply the server's chunks, block changes and mobs; send our position and
+    # edits only while in the overworld the server simulates
+    if network:
+        network.update(player.position if online() else None)
+
+def run_mobs(dt):
+    if online():
+        # The server runs the mobs and tells us what they hit us for
+        player.health -= network.take_damage()
+        dimension.mob_renderer.update()
+        return
+    # Mob AI for the whole population of the current dimension
+    dimension.flow_field.update(player.position)
+    damage, kills = dimension.mob_manager.update(dt, player.position, time.time())
+    player.health -= damage
+    player.experience += 5 * kills
+    dimension.mob_renderer.update()
+
+def flow_water(dt):
+    if not online():
+        dimension.fluid_engine.update(dt)
+
+def autosave(dt):
+    autosaver.update(dt, None if network else overworld.world, player_state)
+
+def cull_chunks(dt):
+    # Only chunks that could be on screen reach the GPU
+    dimension.chunk_renderer.cull(camera_frustum(camera))
+
+def light_chunks():
+    # Light streamed and bulk-edited chunks one per step, ahead of the remeshing that reads it
+    while True:
+        yield from dimension.light_engine.light_steps()
+        yield NEXT_FRAME
+
+def remesh_chunks():
+    # Remesh edited, newly streamed and LOD-switched chunks with whatever budget is left
+    while True:
+        dimension.chunk_renderer.update_lod(camera.world_position)
+        yield from dimension.chunk_renderer.remesh_steps()
+        yield NEXT_FRAME
+
+scheduler.repeat(break_blocks, CRITICAL)
+scheduler.repeat(check_player, CRITICAL)
+scheduler.repeat(cull_chunks, CRITICAL)
+scheduler.repeat(sync_server, HIGH)
+scheduler.submit(stream_chunks(), HIGH)
+scheduler.repeat(run_mobs, HIGH)
+scheduler.submit(light_chunks(), NORMAL)
+scheduler.repeat(flow_water, NORMAL)
+scheduler.repeat(autosave, NORMAL)
+scheduler.submit(remesh_chunks(), LOW)
+
+# Update game state
+def update():
+    milestone = startup_metrics.frame(overworld.chunk_streamer)
+    if milestone:
+        print(milestone)
+    scheduler.run_frame()
+    job_readout.text = scheduler.readout()
+    cull_readout.text = dimension.chunk_renderer.cull_report()
+
 # Generate terrain and run
 generate_terrain()
+print(overworld.chunk_renderer.report())
 app
@@ -1,8 +1,17 @@
 from ursina import *
-from ursina.prefabs.first_person_controller import FirstPersonController
-from ursina import PerlinNoise
 import random
 
+from blockregistry import BlockRegistry
+from chunkstreamer import ChunkStreamer, StartupMetrics
+from lighting import LightEngine
+from voxelplayer import GridFirstPersonController
+from voxelrender import ChunkRenderer, camera_frustum
+from voxelworld import VoxelWorld, block_coords
+from worldgen import PLAINS, ChunkGenerator
+
+# Startup timing starts before the window opens
+startup_metrics = StartupMetrics()
+
 # Initialize Ursina application
 app = Ursina()
 window.title = 'Minecraft 1.0 Clone'
@@ -22,44 +31,65 @@ block_types = {
     'leaves': color.rgb(0, 100, 0),
     'water': color.blue
 }
+block_registry = BlockRegistry(block_types)
+
+# Simplified terrain generation (radii in chunks)
+spawn_radius = 1
+load_radius = 4
+unload_radius = 6
+remesh_budget_ms = 4  # chunk mesh rebuild time allowed per frame
+startup_budget_ms = 200  # spawn-area generation and meshing allowed before the first frame
+world_seed = 1337
 
-# Simplified terrain generation
-terrain_size = 20
-block_size = 1
-pnoise = PerlinNoise()
+# Chunked voxel storage, drawn as one culled and greedy-merged mesh per chunk
+# with skylight baked into its vertex colors
+world = VoxelWorld(block_registry)
+light_engine = LightEngine(world)
+chunk_renderer = ChunkRenderer(world, block_registry.colors, light_engine=light_engine)
 
 def create_voxel(position, block_type):
-    voxel = Entity(
-        model='cube',
-        color=block_types[block_type],
-        scale=block_size,
-        position=position,
-        collider='box'
-    )
-    voxel.block_type = block_type
-    return voxel
+    x, y, z = block_coords(position)
+    world.set_block(x, y, z, block_type)
+    return x, y, z
 
+# Build the spawn area nearest first within startup_budget_ms so the first
+# frame shows quickly; the rest streams in and meshes over the next frames
 def generate_terrain():
-    for x in range(-terrain_size // 2, terrain_size // 2):
-        for z in range(-terrain_size // 2, terrain_size // 2):
-            height = int((pnoise([x * 0.1, z * 0.1]) + 1) * 10)
-            for y in range(0, height + 1):
-                if y == height:
-                    block_type = 'grass'
-                elif y >= height - 3:
-                    block_type = 'dirt'
-                else:
-                    block_type = 'stone'
-                create_voxel(Vec3(x, y, z), block_type)
+    start = time.perf_counter()
+    chunk_streamer.generate_now(player.position, spawn_radius, budget_ms=startup_budget_ms)
+    spent_ms = (time.perf_counter() - start) * 1000
+    chunk_renderer.refresh(budget_ms=max(startup_budget_ms - spent_ms, 0))
 
 # Player setup
-player = FirstPersonController()
+player = GridFirstPersonController(world)
 player.position = Vec3(0, 25, 0)  # Raised to ensure visibility
 print(f"Player position: {player.position}")
 
+# Infinite plains, generated on worker processes around the player
+chunk_streamer = ChunkStreamer(
+    world, chunk_renderer,
+    ChunkGenerator(world_seed, world.block_ids, world.height, biome=PLAINS, structures=False),
+    load_radius=load_radius, unload_radius=unload_radius
+)
+
+def update():
+    milestone = startup_metrics.frame(chunk_streamer)
+    if milestone:
+        print(milestone)
+    chunk_streamer.update(player.position)
+    chunk_renderer.update_lod(camera.world_position)
+    chunk_renderer.refresh(budget_ms=remesh_budget_ms)
+    # Only chunks that could be on screen reach the GPU
+    chunk_renderer.cull(camera_frustum(camera))
+    cull_readout.text = chunk_renderer.cull_report()
+
 # Sky
 sky = Sky(color=color.cyan)
 
+# Chunk meshes submitted for drawing after frustum and cave culling
+cull_readout = Text(text='', position=window.top_left, origin=(-.5, .5), scale=.75)
+
 # Generate terrain and run
 generate_terrain()
+print(chunk_renderer.report())
 app.run()
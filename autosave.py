@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+STATE_FILE = 'player.json'
+
+
+class AutoSaver:
+    """Saves a world's edited chunks and the player's state without stalling the game.
+
+    save() runs on the main thread between jobs, so the world is never
+    halfway through an update. It only takes copy-on-write snapshots of the
+    modified chunks. Unpacking, compressing and writing them, and writing
+    the player state, happen on one worker thread, so saves land in order.
+    Until its write finishes, a chunk is loaded back from its snapshot.
+
+    Loading and unloading go through it too: pass it as a ChunkStreamer's
+    storage in place of the WorldStorage it wraps.
+    """
+
+    def __init__(self, storage, interval=30, executor=None):
+        self.storage = storage
+        self.interval = interval
+        self.executor = executor or ThreadPoolExecutor(1, thread_name_prefix='autosave')
+        self.elapsed = 0.0
+        # Snapshots not yet written, by chunk key
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.futures = []
+        self.last_snapshot_ms = 0.0
+
+    @property
+    def state_path(self):
+        return os.path.join(self.storage.directory, STATE_FILE)
+
+    # Storage interface used by ChunkStreamer
+
+    def load_chunk(self, cx, cz):
+        with self.lock:
+            snapshot = self.pending.get((cx, cz))
+        if snapshot is not None:
+            return np.array(snapshot.blocks)
+        return self.storage.load_chunk(cx, cz)
+
+    def save_chunk(self, chunk):
+        self._submit([chunk.snapshot()], None)
+
+    # Saving
+
+    def save(self, world, state=None, background=True):
+        """Snapshot every chunk with unsaved edits, and state if given, then write them.
+
+        Returns the chunk count. state is a JSON-serializable dict; world
+        may be None to save only the state (e.g. when a server owns the
+        world). In the background the call returns as soon as the
+        snapshots are taken; otherwise (e.g. at exit) it writes them on
+        this thread after any earlier saves finish.
+        """
+        start = time.perf_counter()
+        snapshots = [chunk.snapshot() for chunk in world.chunks.values() if chunk.modified] if world else []
+        self.last_snapshot_ms = (time.perf_counter() - start) * 1000
+        self.elapsed = 0.0
+        if background:
+            self._submit(snapshots, state)
+        else:
+            self.flush()
+            self._track(snapshots)
+            self._write(snapshots, state)
+        return len(snapshots)
+
+    def update(self, dt, world, state=None):
+        """Save in the background once interval seconds have passed.
+
+        state, if given, is called for the dict to save.
+        """
+        self.elapsed += dt
+        if self.elapsed < self.interval:
+            return None
+        return self.save(world, state() if state else None)
+
+    def flush(self):
+        """Wait for every background save to finish."""
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+
+    def busy(self):
+        self.futures = [future for future in self.futures if not future.done()]
+        return bool(self.futures)
+
+    def _track(self, snapshots):
+        with self.lock:
+            for snapshot in snapshots:
+                self.pending[(snapshot.cx, snapshot.cz)] = snapshot
+
+    def _submit(self, snapshots, state):
+        if not snapshots and state is None:
+            return
+        self._track(snapshots)
+        self.futures = [future for future in self.futures if not future.done()]
+        self.futures.append(self.executor.submit(self._write, snapshots, state))
+
+    def _write(self, snapshots, state):
+        for snapshot in snapshots:
+            self.storage.save_chunk(snapshot)
+            key = (snapshot.cx, snapshot.cz)
+            with self.lock:
+                # A later snapshot of the same chunk stays until it is written too
+                if self.pending.get(key) is snapshot:
+                    del self.pending[key]
+        if state is not None:
+            # Write then rename, so a crash mid-write leaves the previous state
+            temporary = self.state_path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(state, f)
+            os.replace(temporary, self.state_path)
+
+    def load_state(self):
+        """The last saved state dict, or None."""
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def shutdown(self):
+        self.flush()
+        self.executor.shutdown()
@@ -0,0 +1,107 @@
+"""Headless world generation benchmark for the craft games.
+
+Generates square worlds of several sizes and seeds with the same chunk
+generators CursorCRAFT4K and GrokCraftHDRV0 use, without opening a window,
+and reports throughput, peak memory, resident block storage (palette-packed
+versus flat arrays) and how many scene entities the world costs now (one
+per non-empty chunk) versus one Entity per block.
+
+    python bench_worldgen.py --sizes 4 8 16 --seeds 1 2 3 --mesh
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from voxeldata import make_block_registry
+from voxelworld import VoxelWorld, build_chunk_mesh
+from worldgen import PLAINS, ChunkGenerator, EndChunkGenerator
+
+PROFILES = {
+    'cursorcraft': lambda seed, world: ChunkGenerator(seed, world.block_ids, world.height),
+    'grokcraft': lambda seed, world: ChunkGenerator(seed, world.block_ids, world.height,
+                                                    biome=PLAINS, structures=False),
+    'end': lambda seed, world: EndChunkGenerator(seed, world.block_ids, world.height),
+}
+
+
+def build(profile, seed, keys, mesh):
+    """Generate (and optionally mesh) the chunks; returns the world, timings and triangle counts."""
+    world = VoxelWorld(make_block_registry())
+    generate = PROFILES[profile](seed, world)
+    start = time.perf_counter()
+    for cx, cz in keys:
+        world.add_chunk(cx, cz, generate(cx, cz))
+    gen_seconds = time.perf_counter() - start
+
+    triangles = naive_triangles = 0
+    mesh_seconds = 0.0
+    if mesh:
+        colors = list(range(len(world.block_names)))
+        start = time.perf_counter()
+        for chunk in world.chunks.values():
+            built = build_chunk_mesh(world, chunk, colors)
+            triangles += len(built.triangles) // 3
+            naive_triangles += built.naive_triangles
+        mesh_seconds = time.perf_counter() - start
+    return world, gen_seconds, mesh_seconds, triangles, naive_triangles
+
+
+def run(profile, size, seed, mesh):
+    keys = [(cx, cz) for cx in range(-size // 2, size - size // 2) for cz in range(-size // 2, size - size // 2)]
+    world, gen_seconds, mesh_seconds, triangles, naive_triangles = build(profile, seed, keys, mesh)
+
+    # tracemalloc slows allocation-heavy code several times over, so peak
+    # memory comes from a second, untimed pass
+    tracemalloc.start()
+    build(profile, seed, keys, mesh)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    world.compact()
+    packed = sum(chunk.nbytes for chunk in world.chunks.values())
+    flat = sum(chunk.blocks.nbytes for chunk in world.chunks.values())
+    world.compact()
+    blocks = sum(int(np.count_nonzero(chunk.blocks)) for chunk in world.chunks.values())
+    chunk_entities = sum(1 for chunk in world.chunks.values() if chunk.blocks.any())
+    return {
+        'profile': profile, 'size': size, 'seed': seed,
+        'chunks': len(keys), 'blocks': blocks,
+        'chunks/s': len(keys) / gen_seconds, 'blocks/s': blocks / gen_seconds,
+        'peak MiB': peak / 2 ** 20, 'packed MiB': packed / 2 ** 20, 'flat MiB': flat / 2 ** 20,
+        'entities (per block)': blocks, 'entities (per chunk)': chunk_entities,
+        'mesh s': mesh_seconds, 'triangles': triangles, 'naive triangles': naive_triangles,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[4, 8, 16], help='world edge length in chunks')
+    parser.add_argument('--seeds', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--mesh', action='store_true', help='also build greedy chunk meshes')
+    args = parser.parse_args(argv)
+
+    columns = ['profile', 'size', 'seed', 'chunks', 'blocks', 'chunks/s', 'blocks/s', 'peak MiB',
+               'packed MiB', 'flat MiB', 'entities (per block)', 'entities (per chunk)']
+    if args.mesh:
+        columns += ['mesh s', 'triangles', 'naive triangles']
+    rows = [run(profile, size, seed, args.mesh)
+            for profile in args.profiles for size in args.sizes for seed in args.seeds]
+
+    def cell(value):
+        return f'{value:,.2f}' if isinstance(value, float) else f'{value:,}' if isinstance(value, int) else value
+    widths = [max(len(column), *(len(cell(row[column])) for row in rows)) for column in columns]
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(cell(row[column]).rjust(width) for column, width in zip(columns, widths)))
+
+    # The generation core must stay importable on build machines without a display
+    if 'ursina' in sys.modules:
+        sys.exit('worldgen pulled in ursina; it must stay headless')
+
+
+if __name__ == '__main__':
+    main()
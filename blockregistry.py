@@ -0,0 +1,71 @@
+import numpy as np
+
+# Block IDs are one byte per block in the chunk arrays, with 0 reserved for air
+AIR = 0
+MAX_BLOCKS = 256
+
+
+class BlockRegistry:
+    """Small integer IDs for a game's block types, with every per-block
+    property in a flat table indexed by ID.
+
+    Tool rows are indexed by tool ID, where 0 stands for bare hands (or any
+    item that is not a tool): suitable[tool, block] says whether the tool is
+    meant for the block and tool_speed[tool] how fast it mines any block.
+    """
+
+    def __init__(self, block_colors, hardness=None, tools=None, transparent=('water',),
+                 passable=('water',), emission=None):
+        # block_colors may also be a plain list of names when colors are not needed
+        if not isinstance(block_colors, dict):
+            block_colors = dict.fromkeys(block_colors)
+        if len(block_colors) >= MAX_BLOCKS:
+            raise ValueError(f"At most {MAX_BLOCKS - 1} block types fit in a byte")
+        # ID 0 is air; the rest follow the order of the game's block_types
+        self.names = [None] + list(block_colors)
+        self.ids = {name: i for i, name in enumerate(self.names) if name}
+        self.colors = [None] + list(block_colors.values())
+
+        def table(values, dtype, default=0):
+            array = np.full(MAX_BLOCKS, default, dtype=dtype)
+            for name, value in values.items():
+                if name in self.ids:
+                    array[self.ids[name]] = value
+            return array
+        self.hardness = table(hardness or {}, np.float32)
+        self.emission = table(emission or {}, np.uint8)
+        # Faces next to transparent blocks stay visible, and light passes through them
+        self.transparent = table(dict.fromkeys(transparent, True), bool)
+        self.transparent[AIR] = True
+        # Blocks the player and mobs collide with
+        self.solid = table(dict.fromkeys(passable, False), bool, default=True)
+        self.solid[AIR] = False
+
+        tools = tools or {}
+        self.tool_names = [None] + list(tools)
+        self.tool_ids = {name: i for i, name in enumerate(self.tool_names) if name}
+        self.tool_speed = np.ones(len(self.tool_names), dtype=np.float32)
+        self.suitable = np.zeros((len(self.tool_names), MAX_BLOCKS), dtype=bool)
+        for name, tool in tools.items():
+            tool_id = self.tool_ids[name]
+            self.tool_speed[tool_id] = tool.get('speed', 1)
+            for block in tool.get('suitable_for', ()):
+                if block in self.ids:
+                    self.suitable[tool_id, self.ids[block]] = True
+
+    def __len__(self):
+        return len(self.names)
+
+    def block_id(self, block):
+        if block is None:
+            return AIR
+        if isinstance(block, str):
+            return self.ids[block]
+        return int(block)
+
+    def tool_id(self, item):
+        return self.tool_ids.get(item, 0)
+
+    def mining_speed(self, item, block):
+        """How fast item breaks block: the tool's speed, or 1 for bare hands and non-tools."""
+        return float(self.tool_speed[self.tool_id(item)])
@@ -0,0 +1,190 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from voxelworld import chunk_coords
+
+
+def default_executor(max_workers=None):
+    # The craft scripts build their window at import time, so workers must be
+    # forked rather than spawned (which re-imports __main__). Without fork,
+    # fall back to threads: NumPy releases the GIL for most of the work.
+    max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('fork'))
+    return ThreadPoolExecutor(max_workers)
+
+
+def chunks_around(center, radius):
+    """Keys of the chunks within radius (in chunks) of center, nearest first."""
+    ccx, ccz = center
+    keys = [(ccx + dx, ccz + dz)
+            for dx in range(-radius, radius + 1)
+            for dz in range(-radius, radius + 1)
+            if dx * dx + dz * dz <= radius * radius]
+    return sorted(keys, key=lambda key: (key[0] - ccx) ** 2 + (key[1] - ccz) ** 2)
+
+
+def in_radius(key, center, radius):
+    return (key[0] - center[0]) ** 2 + (key[1] - center[1]) ** 2 <= radius * radius
+
+
+class ChunkStreamer:
+    """Keeps the chunks within load_radius of a position generated and drops those past unload_radius.
+
+    Chunk arrays are produced by generate(cx, cz) on a worker pool; update()
+    only collects finished arrays and queues them for remeshing, so the main
+    thread pays for budgeted mesh upload alone. Radii are in chunks, and
+    unload_radius > load_radius keeps chunks on a border from thrashing.
+    With a storage, saved chunks are loaded instead of generated and edited
+    chunks are saved before they unload.
+
+    A server streaming for several players passes no renderer and a keep(key)
+    callback saying which chunks any of them still needs; it then drives
+    request(), collect_steps() and unload() itself instead of update().
+    """
+
+    def __init__(self, world, renderer, generate, load_radius=4, unload_radius=6,
+                 executor=None, storage=None, keep=None):
+        self.world = world
+        self.renderer = renderer
+        self.keep = keep
+        self.generate = generate
+        self.storage = storage
+        self.load_radius = load_radius
+        self.unload_radius = unload_radius
+        self.executor = executor
+        self.enabled = True
+        self.pending = {}
+        self.center = None
+
+    def generate_now(self, position, radius, budget_ms=None):
+        """Synchronously generate the chunks around position, e.g. the spawn area, nearest first.
+
+        Chunks already queued on the pool are waited for rather than generated
+        twice. With budget_ms, generation stops once that much time is spent
+        (the chunk under position is always built) and the rest are queued on
+        the pool; returns how many chunks were deferred that way.
+        """
+        start = time.perf_counter()
+        for _ in self.generate_steps(position, radius):
+            if budget_ms is not None and (time.perf_counter() - start) * 1000 >= budget_ms:
+                wanted = chunks_around(chunk_coords(position[0], position[2]), radius)
+                deferred = [key for key in wanted if key not in self.world.chunks]
+                self.request(deferred)
+                return len(deferred)
+        return 0
+
+    def generate_steps(self, position, radius):
+        """generate_now as a resumable job, yielding after each chunk it adds."""
+        for key in chunks_around(chunk_coords(position[0], position[2]), radius):
+            if key in self.world.chunks:
+                continue
+            future = self.pending.pop(key, None)
+            if future is not None and not future.cancelled():
+                self.world.add_chunk(*key, future.result())
+            elif not self._load_saved(*key):
+                self.world.add_chunk(*key, self.generate(*key))
+            yield key
+
+    def prefetch(self, position):
+        """Queue the chunks around position without waiting for them."""
+        self._schedule(chunk_coords(position[0], position[2]))
+
+    def _load_saved(self, cx, cz):
+        blocks = self.storage.load_chunk(cx, cz) if self.storage else None
+        if blocks is None:
+            return False
+        self.world.add_chunk(cx, cz, blocks)
+        return True
+
+    def update(self, position):
+        for _ in self.update_steps(position):
+            pass
+
+    def update_steps(self, position):
+        """update() as a resumable job, yielding after each finished chunk it adds."""
+        if not self.enabled:
+            return
+        center = chunk_coords(position[0], position[2])
+        if center != self.center:
+            self.center = center
+            self._schedule(center)
+            self.unload()
+        yield from self.collect_steps()
+
+    def _schedule(self, center):
+        self.request(chunks_around(center, self.load_radius))
+
+    def request(self, keys):
+        """Load the saved chunks among keys now and queue the rest on the pool."""
+        if self.executor is None:
+            self.executor = default_executor()
+        for key in keys:
+            if key not in self.world.chunks and key not in self.pending and not self._load_saved(*key):
+                self.pending[key] = self.executor.submit(self.generate, *key)
+
+    def _in_reach(self, key):
+        return in_radius(key, self.center, self.unload_radius)
+
+    def unload(self):
+        """Drop the loaded and queued chunks keep() rejects (by default, those past unload_radius)."""
+        keep = self.keep or self._in_reach
+        for key in [key for key in self.world.chunks if not keep(key)]:
+            chunk = self.world.remove_chunk(*key)
+            if self.storage and chunk.modified:
+                self.storage.save_chunk(chunk)
+            if self.renderer is not None:
+                self.renderer.remove(*key)
+        for key in [key for key in self.pending if not keep(key)]:
+            self.pending.pop(key).cancel()
+
+    def collect_steps(self):
+        """Add the chunks the pool has finished, yielding after each."""
+        for key in [key for key, future in self.pending.items() if future.done()]:
+            # An unload or generate_steps between steps may have taken it already
+            future = self.pending.pop(key, None)
+            if future is not None and not future.cancelled():
+                self.world.add_chunk(*key, future.result())
+                yield key
+
+    def complete(self):
+        """True once every chunk within load_radius of the last update() position is loaded."""
+        return (self.center is not None and not self.pending
+                and all(key in self.world.chunks for key in chunks_around(self.center, self.load_radius)))
+
+    def cancel(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.center = None
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class StartupMetrics:
+    """Time from startup to the first rendered frame and to a fully loaded and meshed world.
+
+    Create it as early as possible and call frame() once per frame.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_frame = None
+        self.full_world = None
+
+    def frame(self, streamer):
+        """Record this frame; returns a report line on the frame a milestone is reached, else None."""
+        elapsed = time.perf_counter() - self.start
+        if self.first_frame is None:
+            self.first_frame = elapsed
+            return f"Time to first frame: {elapsed * 1000:.0f} ms"
+        if self.full_world is None and streamer.complete() and not streamer.world.dirty_chunks():
+            self.full_world = elapsed
+            return (f"Time to full world: {elapsed * 1000:.0f} ms "
+                    f"({len(streamer.world.chunks)} chunks)")
+        return None
@@ -0,0 +1,199 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from voxelworld import CHUNK_SIZE, chunk_coords
+
+# Chunk columns are split into cubic sections for visibility. Faces are
+# numbered -x, +x, -y, +y, -z, +z.
+SECTION_SIZE = CHUNK_SIZE
+FACES = ((-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1))
+OPPOSITE = (1, 0, 3, 2, 5, 4)
+ALL_FACES = (1 << len(FACES)) - 1
+
+
+class Frustum:
+    """A perspective view volume as inward-facing planes, for testing boxes against.
+
+    fov is the (horizontal, vertical) field of view in degrees. Directions
+    are world-space unit vectors; the signs of right and up do not matter.
+    """
+
+    def __init__(self, position, forward, right, up, fov, far):
+        self.position = np.array(tuple(position), dtype=np.float64)
+        forward, right, up = (np.array(tuple(vector), dtype=np.float64) for vector in (forward, right, up))
+        planes = []
+        for side, half_angle in ((right, fov[0]), (up, fov[1])):
+            half_angle = math.radians(half_angle) / 2
+            for sign in (1, -1):
+                planes.append(forward * math.sin(half_angle) + sign * side * math.cos(half_angle))
+        planes.append(-forward)
+        self.normals = np.array(planes)
+        # A point p is inside when normals @ p + offsets >= 0 for every plane
+        self.offsets = -self.normals @ self.position
+        self.offsets[-1] += far
+
+    def contains_boxes(self, mins, maxs):
+        """Per box, whether any of it may lie inside; mins and maxs are (n, 3) corners."""
+        mins, maxs = np.asarray(mins, dtype=np.float64), np.asarray(maxs, dtype=np.float64)
+        # Test the corner furthest along each plane's normal
+        corners = np.where(self.normals[:, None, :] >= 0, maxs[None], mins[None])
+        distances = (corners * self.normals[:, None, :]).sum(axis=2) + self.offsets[:, None]
+        return (distances >= 0).all(axis=0)
+
+
+def section_connectivity(blocks, see_through):
+    """Per section of a chunk's (x, y, z) block array, a bitmask of the faces each face can see.
+
+    Returns a list with one list of six ints per section: bit b of entry a
+    is set when some path of see-through cells joins face a to face b.
+    Space above the world counts as open.
+    """
+    sections = -(-blocks.shape[1] // SECTION_SIZE)
+    open_cells = np.ones((CHUNK_SIZE, sections * SECTION_SIZE, CHUNK_SIZE), dtype=bool)
+    open_cells[:, :blocks.shape[1], :] = see_through[blocks]
+    open_cells = open_cells.reshape(CHUNK_SIZE, sections, SECTION_SIZE, CHUNK_SIZE).transpose(1, 0, 2, 3)
+    result = []
+    mixed = []
+    for index, cells in enumerate(open_cells):
+        if cells.all():
+            result.append([ALL_FACES] * len(FACES))
+        elif not cells.any():
+            result.append([0] * len(FACES))
+        else:
+            result.append(None)
+            mixed.append(index)
+    if mixed:
+        labels = _label_regions(open_cells[mixed])
+        for index, regions in zip(mixed, labels):
+            faces = [set(np.unique(face).tolist()) - {-1} for face in (
+                regions[0], regions[-1], regions[:, 0], regions[:, -1], regions[:, :, 0], regions[:, :, -1])]
+            result[index] = [sum(1 << b for b in range(len(FACES)) if faces[a] & faces[b])
+                             for a in range(len(FACES))]
+    return result
+
+
+def _label_regions(open_cells):
+    # Connected regions of open cells per section, as the smallest flat
+    # index in each region (-1 for blocked cells). Each pass takes the
+    # smallest label among a cell's neighbors, then jumps labels through the
+    # cells they name, so long winding caves still settle in a few passes.
+    count = open_cells.size
+    table = np.arange(count + 1)
+    labels = np.where(open_cells, table[:-1].reshape(open_cells.shape), count)
+    while True:
+        lowest = labels.copy()
+        for axis in (1, 2, 3):
+            ahead = [slice(None)] * 4
+            behind = [slice(None)] * 4
+            ahead[axis], behind[axis] = slice(1, None), slice(None, -1)
+            ahead, behind = tuple(ahead), tuple(behind)
+            np.minimum(lowest[ahead], labels[behind], out=lowest[ahead])
+            np.minimum(lowest[behind], labels[ahead], out=lowest[behind])
+        lowest = np.where(open_cells, lowest, count)
+        for _ in range(4):
+            table[:-1] = lowest.ravel()
+            lowest = table[lowest]
+        if np.array_equal(lowest, labels):
+            return np.where(open_cells, labels, -1)
+        labels = lowest
+
+
+class ChunkCuller:
+    """Picks the chunks of a VoxelWorld that could be on screen from a camera.
+
+    Each chunk section knows which of its faces can see each other through
+    air and other see-through blocks. A breadth-first walk out from the
+    camera's section crosses from section to section only through faces
+    joined that way, only into sections inside the view frustum, and never
+    back toward the camera, so terrain that is off screen or walled off
+    underground (or caves seen from the surface) is left out.
+
+    Working out a chunk's connectivity costs a few milliseconds, so it is
+    done by update_chunk(), which ChunkRenderer calls as part of each
+    (budgeted) mesh build; until then a chunk counts as fully open. Like any
+    walk that visits each section once it errs toward culling a section
+    reachable only by a second, different route; in practice that is rare
+    and lasts only until the camera moves.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.see_through = world.transparent
+        self.sections = -(-world.height // SECTION_SIZE)
+        self.connectivity = {}
+        # Chunk columns considered, in view and found visible by the last walk
+        self.total = self.in_view = self.visible = 0
+        world.listeners.append(self)
+
+    # World listener hooks
+
+    def chunk_added(self, chunk):
+        self.connectivity.pop((chunk.cx, chunk.cz), None)
+
+    def chunk_changed(self, chunk):
+        self.connectivity.pop((chunk.cx, chunk.cz), None)
+
+    def chunk_removed(self, chunk):
+        self.connectivity.pop((chunk.cx, chunk.cz), None)
+
+    def block_changed(self, x, y, z, old, new):
+        if self.see_through[old] != self.see_through[new]:
+            self.connectivity.pop(chunk_coords(x, z), None)
+
+    # Visibility
+
+    def update_chunk(self, chunk):
+        """Work out which faces of the chunk's sections see each other, after it loads or changes."""
+        self.connectivity[(chunk.cx, chunk.cz)] = section_connectivity(chunk.blocks, self.see_through)
+
+    def visible_chunks(self, frustum):
+        """Keys of the loaded chunks that could be on screen."""
+        keys = list(self.world.chunks)
+        rows = {key: row for row, key in enumerate(keys)}
+        # One extra layer of sections above the world lets sight pass over hills
+        layers = self.sections + 1
+        grid = np.array(keys, dtype=np.float64).reshape(-1, 2) * CHUNK_SIZE
+        mins = np.empty((len(keys), layers, 3))
+        mins[:, :, 0] = grid[:, None, 0]
+        mins[:, :, 1] = np.arange(layers) * SECTION_SIZE
+        mins[:, :, 2] = grid[:, None, 1]
+        # Blocks are unit cubes centered on their integer coordinates
+        mins -= 0.5
+        in_view = frustum.contains_boxes(mins.reshape(-1, 3), (mins + SECTION_SIZE).reshape(-1, 3))
+        in_view = in_view.reshape(len(keys), layers).tolist()
+        self.total = len(keys)
+        self.in_view = sum(1 for row in in_view if any(row))
+
+        x, y, z = (int(math.floor(value + 0.5)) for value in frustum.position)
+        start_key = chunk_coords(x, z)
+        if start_key not in rows:
+            # Outside the loaded world there is nothing to walk through
+            visible = {key for key, row in zip(keys, in_view) if any(row)}
+            self.visible = len(visible)
+            return visible
+        start = (start_key[0], min(max(y // SECTION_SIZE, 0), self.sections), start_key[1])
+        visible = {start_key}
+        seen = {start}
+        queue = deque([(start, ALL_FACES, 0)])
+        while queue:
+            (cx, sy, cz), exits, travelled = queue.popleft()
+            for face, (dx, dy, dz) in enumerate(FACES):
+                if not exits & (1 << face) or travelled & (1 << OPPOSITE[face]):
+                    continue
+                key, layer = (cx + dx, cz + dz), sy + dy
+                section = (key[0], layer, key[1])
+                row = rows.get(key)
+                if row is None or not 0 <= layer < layers or section in seen or not in_view[row][layer]:
+                    continue
+                seen.add(section)
+                if layer < self.sections:
+                    visible.add(key)
+                    faces = self.connectivity.get(key)
+                    onward = faces[layer][OPPOSITE[face]] if faces else ALL_FACES
+                else:
+                    onward = ALL_FACES
+                queue.append((section, onward, travelled | (1 << face)))
+        self.visible = len(visible)
+        return visible
@@ -0,0 +1,113 @@
+from voxelworld import AIR, chunk_coords
+
+HORIZONTAL = ((1, 0, 0), (-1, 0, 0), (0, 0, 1), (0, 0, -1))
+NEIGHBORS = HORIZONTAL + ((0, 1, 0), (0, -1, 0))
+
+
+class FluidEngine:
+    """Flowing water as a cellular automaton over a VoxelWorld's block arrays.
+
+    Water blocks without a level are sources (all generated water is);
+    flowing water keeps its distance from a source in a sparse map and dries
+    up past max_spread. Only cells next to a change from the last tick are
+    evaluated, so still water costs nothing, and a tick looks at no more than
+    max_cells of them, leaving the rest active for the next tick. Ticks run
+    at tick_rate per second however fast frames are.
+
+    Flow levels are not saved: flowing water in a saved chunk reloads as
+    still water.
+    """
+
+    def __init__(self, world, fluid='water', max_spread=7, tick_rate=4, max_cells=256, max_ticks_per_frame=2):
+        self.world = world
+        self.fluid = world.block_id(fluid)
+        self.max_spread = max_spread
+        self.tick_interval = 1 / tick_rate
+        self.max_cells = max_cells
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.levels = {}
+        # Cells to evaluate next tick, as an insertion-ordered set
+        self.active = {}
+        self.accumulator = 0.0
+        world.listeners.append(self)
+
+    # World listener hooks
+
+    def block_changed(self, x, y, z, old, new):
+        if new != self.fluid:
+            self.levels.pop((x, y, z), None)
+        self._activate_around(x, y, z)
+
+    def chunk_removed(self, chunk):
+        key = (chunk.cx, chunk.cz)
+        for cells in (self.levels, self.active):
+            for cell in [cell for cell in cells if chunk_coords(cell[0], cell[2]) == key]:
+                del cells[cell]
+
+    # Simulation
+
+    def _activate_around(self, x, y, z):
+        self.active[(x, y, z)] = True
+        for dx, dy, dz in NEIGHBORS:
+            self.active[(x + dx, y + dy, z + dz)] = True
+
+    def _block(self, x, y, z):
+        # Unloaded and out-of-world cells act as walls
+        if not 0 <= y < self.world.height or not self.world.is_loaded(x, z):
+            return None
+        return self.world.get_block(x, y, z)
+
+    def _spreads(self, x, y, z):
+        # Water only spreads sideways once it rests on something other than air or falling water
+        below = self._block(x, y - 1, z)
+        return below is not None and below != AIR and (below != self.fluid or (x, y - 1, z) not in self.levels)
+
+    def _target(self, x, y, z):
+        """Flow level a cell should hold next tick, None for no water, or False to leave it alone."""
+        block = self._block(x, y, z)
+        if block is None or block not in (AIR, self.fluid):
+            return False
+        if block == self.fluid and (x, y, z) not in self.levels:
+            return False
+        if self._block(x, y + 1, z) == self.fluid:
+            return 1
+        fed = [self.levels.get((x + dx, y, z + dz), 0) + 1 for dx, _, dz in HORIZONTAL
+               if self._block(x + dx, y, z + dz) == self.fluid and self._spreads(x + dx, y, z + dz)]
+        level = min(fed, default=None)
+        return level if level is not None and level <= self.max_spread else None
+
+    def tick(self):
+        """Evaluate up to max_cells active cells, then apply every change at once; returns cells evaluated."""
+        cells = []
+        while self.active and len(cells) < self.max_cells:
+            cell = next(iter(self.active))
+            del self.active[cell]
+            cells.append(cell)
+        changes = [(cell, self._target(*cell)) for cell in cells]
+        for cell, level in changes:
+            if level is False:
+                continue
+            is_fluid = self.world.get_block(*cell) == self.fluid
+            if level is None:
+                if is_fluid:
+                    self.world.set_block(*cell, AIR)
+            elif not is_fluid:
+                self.world.set_block(*cell, self.fluid)
+                self.levels[cell] = level
+            elif self.levels.get(cell) != level:
+                # A level change alone is invisible to the world, so wake the neighbors here
+                self.levels[cell] = level
+                self._activate_around(*cell)
+        return len(cells)
+
+    def update(self, dt):
+        """Run the fixed-rate ticks due after dt seconds; returns how many ran."""
+        self.accumulator += dt
+        ticks = 0
+        while self.accumulator >= self.tick_interval and ticks < self.max_ticks_per_frame:
+            self.accumulator -= self.tick_interval
+            self.tick()
+            ticks += 1
+        # Drop a backlog from a long stall instead of catching up over many frames
+        self.accumulator = min(self.accumulator, self.tick_interval)
+        return ticks
@@ -0,0 +1,119 @@
+import heapq
+import itertools
+import time
+
+# Job priorities, most urgent first. Critical jobs run every frame even
+# once the budget is spent; the rest wait for a frame with time left.
+CRITICAL = 0
+HIGH = 1
+NORMAL = 2
+LOW = 3
+PRIORITY_NAMES = ('critical', 'high', 'normal', 'low')
+
+# Yielded by a job that is done for this frame, as opposed to a bare yield,
+# which lets it resume in the same frame if there is budget left
+NEXT_FRAME = object()
+
+
+class Job:
+    def __init__(self, work, priority, name):
+        self.name = name or getattr(work, '__name__', 'job')
+        self.priority = priority
+        self.cancelled = False
+        self.done = False
+        # Plain callables run once; generators run one step per resume
+        self.steps = work if hasattr(work, '__next__') else None
+        self.work = None if self.steps else work
+
+    def cancel(self):
+        self.cancelled = True
+
+    def step(self):
+        """Run one step; returns NEXT_FRAME, None (more to do) or True (finished)."""
+        if self.steps is None:
+            self.work()
+            self.done = True
+            return True
+        try:
+            result = next(self.steps)
+        except StopIteration:
+            self.done = True
+            return True
+        return NEXT_FRAME if result is NEXT_FRAME else None
+
+
+class JobScheduler:
+    """Cooperative, prioritized jobs run from ursina's update() under a per-frame time budget.
+
+    Long work is written as a generator that yields between steps, so it
+    can stop when the frame's budget is used up and resume next frame.
+    Within a priority, jobs take turns step by step.
+    """
+
+    def __init__(self, budget_ms=8):
+        self.budget_ms = budget_ms
+        self.queue = []
+        self.waiting = []
+        self.order = itertools.count()
+        self.last_used_ms = 0.0
+        self.last_steps = 0
+
+    def submit(self, work, priority=NORMAL, name=None):
+        """Queue a callable (run once) or a generator (stepped until it finishes); returns its Job."""
+        job = Job(work, priority, name)
+        heapq.heappush(self.queue, (priority, next(self.order), job))
+        return job
+
+    def repeat(self, function, priority=NORMAL, name=None):
+        """Call function(dt) once per frame, with dt the time since its last call, until cancelled."""
+        def steps():
+            last = time.perf_counter()
+            while True:
+                now = time.perf_counter()
+                function(now - last)
+                last = now
+                yield NEXT_FRAME
+        return self.submit(steps(), priority, name or function.__name__)
+
+    def run_frame(self):
+        """Run queued jobs, most urgent first, until the frame budget is spent; returns milliseconds used."""
+        start = time.perf_counter()
+        for entry in self.waiting:
+            heapq.heappush(self.queue, entry)
+        self.waiting = []
+        steps = 0
+        while self.queue:
+            priority, _, job = heapq.heappop(self.queue)
+            if job.cancelled:
+                continue
+            over_budget = (time.perf_counter() - start) * 1000 >= self.budget_ms
+            if over_budget and priority > CRITICAL:
+                heapq.heappush(self.queue, (priority, next(self.order), job))
+                break
+            result = job.step()
+            steps += 1
+            if result is True:
+                continue
+            entry = (priority, next(self.order), job)
+            # Jobs that asked to wait, and any once the budget is gone, resume next frame
+            if result is NEXT_FRAME or (time.perf_counter() - start) * 1000 >= self.budget_ms:
+                self.waiting.append(entry)
+            else:
+                heapq.heappush(self.queue, entry)
+        self.last_used_ms = (time.perf_counter() - start) * 1000
+        self.last_steps = steps
+        return self.last_used_ms
+
+    def depths(self):
+        """Live jobs per priority."""
+        counts = [0] * len(PRIORITY_NAMES)
+        for priority, _, job in itertools.chain(self.queue, self.waiting):
+            if not job.cancelled:
+                counts[priority] += 1
+        return counts
+
+    def readout(self):
+        depths = self.depths()
+        queued = ' '.join(f'{name} {count}' for name, count in zip(PRIORITY_NAMES, depths))
+        return (f"jobs: {sum(depths)} queued ({queued}), {self.last_steps} steps, "
+                f"{self.last_used_ms:.1f}/{self.budget_ms} ms ({100 * self.last_used_ms / self.budget_ms:.0f}%)")
@@ -0,0 +1,398 @@
+from collections import deque
+
+import numpy as np
+
+from palette import SECTION_HEIGHT, SECTION_WIDTH, ChunkCache, PaletteSection, unpack_rows
+from voxelworld import CHUNK_BORDERS, CHUNK_SIZE, MAX_LIGHT, chunk_coords, chunk_spans, pad_from_neighbors
+
+NEIGHBORS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+
+class LightLevels:
+    """One chunk's levels for one light channel, packed into palette sections like Chunk blocks.
+
+    Most sections are all 15 (open sky) or all 0 (underground, or block
+    light away from sources) and pack to a shared uniform section; the rest
+    need at most 4 bits a cell. dense expands them for bulk work until the
+    channel's ChunkCache packs them again.
+    """
+
+    __slots__ = ('height', 'sections', 'array', 'cache')
+
+    def __init__(self, levels, cache):
+        self.height = levels.shape[1]
+        self.sections = None
+        self.array = levels
+        self.cache = cache
+        cache.touch(self)
+
+    @property
+    def dense(self):
+        if self.array is None:
+            self.array = np.concatenate([section.unpack() for section in self.sections], axis=1)
+        self.cache.touch(self)
+        return self.array
+
+    def rows(self, y0, y1):
+        """Levels in rows y0 to y1 as a dense array, without expanding packed levels."""
+        if self.array is not None:
+            return self.array[:, y0:y1, :]
+        return unpack_rows(self.sections, y0, y1)
+
+    def write(self, local, levels):
+        """Store levels at the local (x, y, z) slices, repacking just the sections that change."""
+        if self.array is not None:
+            self.array[local] = levels
+            return
+        xs, ys, zs = local
+        for index in range(ys.start // SECTION_HEIGHT, -(-ys.stop // SECTION_HEIGHT)):
+            bottom = index * SECTION_HEIGHT
+            y0, y1 = max(ys.start, bottom), min(ys.stop, bottom + SECTION_HEIGHT)
+            section = self.sections[index].unpack()
+            part = levels[:, y0 - ys.start:y1 - ys.start, :]
+            if not np.array_equal(section[xs, y0 - bottom:y1 - bottom, zs], part):
+                section[xs, y0 - bottom:y1 - bottom, zs] = part
+                self.sections[index] = PaletteSection.pack(section)
+
+    def get(self, lx, y, lz):
+        if self.array is not None:
+            return int(self.array[lx, y, lz])
+        section = self.sections[y // SECTION_HEIGHT]
+        return section.get((lx * SECTION_HEIGHT + y % SECTION_HEIGHT) * SECTION_WIDTH + lz)
+
+    def compact(self):
+        if self.array is None:
+            return
+        self.sections = [PaletteSection.pack(self.array[:, y:y + SECTION_HEIGHT, :])
+                         for y in range(0, self.height, SECTION_HEIGHT)]
+        self.array = None
+        self.cache.discard(self)
+
+    @property
+    def nbytes(self):
+        if self.array is not None:
+            return self.array.nbytes
+        return sum(section.nbytes for section in self.sections)
+
+
+class LightChannel:
+    """Light levels by chunk key. Indexing gives the chunk's dense array."""
+
+    def __init__(self, dense_chunks):
+        self.cache = ChunkCache(dense_chunks)
+        self.levels = {}
+
+    def __contains__(self, key):
+        return key in self.levels
+
+    def __getitem__(self, key):
+        return self.levels[key].dense
+
+    def __setitem__(self, key, levels):
+        old = self.levels.get(key)
+        if old is not None:
+            self.cache.discard(old)
+        self.levels[key] = LightLevels(levels, self.cache)
+
+    def get(self, key):
+        levels = self.levels.get(key)
+        return levels.dense if levels is not None else None
+
+    def level(self, key, lx, y, lz):
+        """One cell's level, read without expanding the chunk; None if the chunk is not lit."""
+        levels = self.levels.get(key)
+        return levels.get(lx, y, lz) if levels is not None else None
+
+    def pop(self, key, default=None):
+        levels = self.levels.pop(key, None)
+        if levels is None:
+            return default
+        self.cache.discard(levels)
+        return levels.dense
+
+    @property
+    def nbytes(self):
+        return sum(levels.nbytes for levels in self.levels.values())
+
+
+class LightEngine:
+    """Skylight and block light for every loaded chunk of a VoxelWorld.
+
+    Loaded and bulk-edited chunks are queued rather than lit on the spot:
+    light_steps() lights them one per step as a scheduler job, and
+    padded_light() lights a chunk still waiting when it is meshed first.
+    Lighting a chunk is a vectorized flood fill over its arrays, and light
+    reaching across a border is pushed into the neighbor. A single-block
+    edit recomputes only the box its light can reach the same way: 14
+    cells around it, and for skylight everything below it as well. Every
+    chunk whose light changes is queued for a remesh.
+
+    Light is stored packed like chunk blocks, with dense arrays kept only
+    for the dense_chunks most recently used chunks per channel (by default
+    as many as the world keeps expanded).
+    """
+
+    def __init__(self, world, emission=None, dense_chunks=None):
+        self.world = world
+        # Light travels through the same blocks meshing treats as see-through
+        self.transparent = world.transparent.copy()
+        # Light sources come from the world's block registry unless given here by name
+        self.emission = world.registry.emission.copy()
+        for name, level in (emission or {}).items():
+            if name in world.block_ids:
+                self.emission[world.block_ids[name]] = level
+        if dense_chunks is None:
+            dense_chunks = world.chunk_cache.limit
+        self.sky = LightChannel(dense_chunks)
+        self.block = LightChannel(dense_chunks)
+        # Keys of chunks waiting to be lit, oldest first, as an insertion-ordered set
+        self.unlit = {}
+        for chunk in world.chunks.values():
+            self.chunk_added(chunk)
+        world.listeners.append(self)
+
+    # World listener hooks
+
+    def chunk_added(self, chunk):
+        self.unlit[(chunk.cx, chunk.cz)] = True
+
+    def chunk_changed(self, chunk):
+        # The old light stays in use until the chunk's turn comes
+        self.unlit[(chunk.cx, chunk.cz)] = True
+
+    def chunk_removed(self, chunk):
+        key = (chunk.cx, chunk.cz)
+        self.unlit.pop(key, None)
+        self.sky.pop(key, None)
+        self.block.pop(key, None)
+
+    def block_changed(self, x, y, z, old, new):
+        reach = MAX_LIGHT - 1
+        touched = set()
+        # Swapping blocks that pass and give off the same light (air and water) changes nothing
+        if self.transparent[old] != self.transparent[new]:
+            # Skylight through the cell may fall all the way down before it spreads
+            touched |= self._relight(self.sky, (x - reach, 0, z - reach),
+                                     (x + reach + 1, y + reach + 1, z + reach + 1))
+        if self.transparent[old] != self.transparent[new] or self.emission[old] != self.emission[new]:
+            touched |= self._relight(self.block, (x - reach, y - reach, z - reach),
+                                     (x + reach + 1, y + reach + 1, z + reach + 1))
+        self._mark(touched)
+
+    # Scheduling
+
+    def light_steps(self):
+        """Light the queued chunks as a resumable job, yielding after each one."""
+        while self.unlit:
+            key = next(iter(self.unlit))
+            del self.unlit[key]
+            chunk = self.world.chunks.get(key)
+            if chunk is not None:
+                self._light_chunk(chunk)
+            yield key
+
+    # Queries
+
+    def light_at(self, x, y, z):
+        return self._get(self.sky, x, y, z), self._get(self.block, x, y, z)
+
+    def padded_light(self, chunk):
+        """max(sky, block) light of a chunk with a one-cell border, laid out like padded_blocks."""
+        key = (chunk.cx, chunk.cz)
+        if key in self.unlit or key not in self.sky:
+            self.unlit.pop(key, None)
+            self._light_chunk(chunk)
+        sky = self._padded(self.sky, chunk, top=MAX_LIGHT)
+        block = self._padded(self.block, chunk, top=0)
+        return np.maximum(sky, block)
+
+    # Full-chunk lighting
+
+    def _padded(self, channel, chunk, top):
+        height = chunk.height
+        padded = np.zeros((CHUNK_SIZE + 2, height + 2, CHUNK_SIZE + 2), dtype=np.uint8)
+        padded[1:-1, 1:-1, 1:-1] = channel[(chunk.cx, chunk.cz)]
+        padded[:, -1, :] = top
+        pad_from_neighbors(padded, chunk.cx, chunk.cz, channel.get)
+        return padded
+
+    def _light_chunk(self, chunk):
+        key = (chunk.cx, chunk.cz)
+        transparent = self.transparent[chunk.blocks]
+        # Skylight falls straight down at full strength until the first opaque block
+        blocked = np.logical_or.accumulate(~transparent[:, ::-1, :], axis=1)[:, ::-1, :]
+        self.sky[key] = np.where(blocked, 0, MAX_LIGHT).astype(np.uint8)
+        self.block[key] = self.emission[chunk.blocks]
+        for channel in (self.sky, self.block):
+            self._relax(channel, chunk, transparent)
+        self._spill(chunk)
+        # Lit neighbors meshed before this chunk had light show dark faces toward it
+        for dx, dz, *_ in CHUNK_BORDERS:
+            if (chunk.cx + dx, chunk.cz + dz) in self.sky:
+                self.world.mark_dirty(chunk.cx + dx, chunk.cz + dz)
+
+    def _relax(self, channel, chunk, transparent):
+        # Flood fill as repeated "brightest neighbor minus one" until nothing changes
+        key = (chunk.cx, chunk.cz)
+        for _ in range(MAX_LIGHT):
+            padded = self._padded(channel, chunk, top=MAX_LIGHT if channel is self.sky else 0).astype(np.int16)
+            inner = padded[1:-1, 1:-1, 1:-1]
+            spread = np.zeros_like(inner)
+            for dx, dy, dz in NEIGHBORS:
+                spread = np.maximum(spread, padded[1 + dx:padded.shape[0] - 1 + dx,
+                                                   1 + dy:padded.shape[1] - 1 + dy,
+                                                   1 + dz:padded.shape[2] - 1 + dz])
+            lit = np.where(transparent, np.maximum(inner, spread - 1), inner)
+            if np.array_equal(lit, inner):
+                break
+            channel[key] = lit.astype(np.uint8)
+
+    def _spill(self, chunk):
+        # Push light across each border where it is brighter than the loaded neighbor can see
+        touched = set()
+        ox, oz = chunk.cx * CHUNK_SIZE, chunk.cz * CHUNK_SIZE
+        for channel in (self.sky, self.block):
+            light = channel[(chunk.cx, chunk.cz)].astype(np.int16)
+            for dx, dz, ours, theirs, _ in CHUNK_BORDERS:
+                neighbor = self.world.chunks.get((chunk.cx + dx, chunk.cz + dz))
+                if neighbor is None or (neighbor.cx, neighbor.cz) not in channel:
+                    continue
+                other = channel[(neighbor.cx, neighbor.cz)][theirs].astype(np.int16)
+                brighter = (light[ours] - 1 > other) & self.transparent[neighbor.blocks[theirs]]
+                edge = 0 if dx + dz < 0 else CHUNK_SIZE - 1
+                if dx:
+                    seeds = [(ox + edge, y, oz + z) for y, z in zip(*(i.tolist() for i in np.nonzero(brighter)))]
+                else:
+                    seeds = [(ox + x, y, oz + edge) for x, y in zip(*(i.tolist() for i in np.nonzero(brighter)))]
+                self._propagate(channel, seeds, touched)
+        touched.discard((chunk.cx, chunk.cz))
+        self._mark(touched)
+
+    # Box relighting
+
+    def _relight(self, channel, low, high):
+        """Recompute a channel from scratch inside the box from low to high (exclusive).
+
+        The cells around the box keep their light and act as its boundary,
+        so the box must hold every cell whose light can change. Cells of
+        chunks not loaded or lit yet stay as they are. Returns the keys of
+        the chunks to remesh.
+        """
+        height = self.world.height
+        (x0, y0, z0), (x1, y1, z1) = low, high
+        y0, y1 = max(y0, 0), min(y1, height)
+        # The box and a one-cell border, which stays fixed
+        shape = (x1 - x0 + 2, y1 - y0 + 2, z1 - z0 + 2)
+        light = np.zeros(shape, dtype=np.int16)
+        blocks = np.zeros(shape, dtype=np.uint8)
+        free = np.zeros(shape, dtype=bool)
+        ya, yb = max(y0 - 1, 0), min(y1 + 1, height)
+        rows = slice(ya - (y0 - 1), yb - (y0 - 1))
+        spans = []
+        # Read straight from packed chunks: expanding (and evicting) up to
+        # nine of them would cost more than the relight itself
+        for cx, cz, xs, zs in chunk_spans(x0 - 1, z0 - 1, shape[0], shape[2]):
+            chunk = self.world.chunks.get((cx, cz))
+            levels = channel.levels.get((cx, cz))
+            if chunk is None or levels is None:
+                continue
+            ox, oz = cx * CHUNK_SIZE - (x0 - 1), cz * CHUNK_SIZE - (z0 - 1)
+            box = (slice(ox + xs.start, ox + xs.stop), rows, slice(oz + zs.start, oz + zs.stop))
+            light[box] = levels.rows(ya, yb)[xs.start:xs.stop, :, zs.start:zs.stop]
+            blocks[box] = chunk.rows(ya, yb)[xs.start:xs.stop, :, zs.start:zs.stop]
+            free[box] = True
+            local = (slice(xs.start, xs.stop), slice(ya, yb), slice(zs.start, zs.stop))
+            spans.append((levels, (cx, cz), box, local))
+        before = light.copy()
+        if y1 == height and channel is self.sky:
+            light[:, -1, :] = MAX_LIGHT
+        free[[0, -1]] = False
+        free[:, [0, -1]] = False
+        free[:, :, [0, -1]] = False
+        transparent = self.transparent[blocks]
+        if channel is self.sky:
+            # Full light falls from a full-light cell above the box down to the first opaque block
+            open_above = transparent.copy()
+            open_above[:, -1, :] = light[:, -1, :] == MAX_LIGHT
+            lit = np.logical_and.accumulate(open_above[:, ::-1, :], axis=1)[:, ::-1, :]
+            start = np.where(lit, MAX_LIGHT, 0).astype(np.int16)
+        else:
+            start = self.emission[blocks].astype(np.int16)
+        light = np.where(free, start, light)
+        inner = (slice(1, -1),) * 3
+        spreads = free[inner] & transparent[inner]
+        for _ in range(MAX_LIGHT):
+            spread = np.zeros(spreads.shape, dtype=np.int16)
+            for dx, dy, dz in NEIGHBORS:
+                np.maximum(spread, light[1 + dx:shape[0] - 1 + dx, 1 + dy:shape[1] - 1 + dy,
+                                         1 + dz:shape[2] - 1 + dz], out=spread)
+            lit = np.where(spreads, np.maximum(light[inner], spread - 1), light[inner])
+            if np.array_equal(lit, light[inner]):
+                break
+            light[inner] = lit
+        touched = set()
+        for levels, key, box, local in spans:
+            changed = before[box] != light[box]
+            if not changed.any():
+                continue
+            levels.write(local, light[box].astype(np.uint8))
+            touched.add(key)
+            # Faces of the neighboring chunk look into border cells
+            (cx, cz), (xs, _, zs) = key, local
+            for edge, dx, dz in ((xs.start == 0 and changed[0].any(), -1, 0),
+                                 (xs.stop == CHUNK_SIZE and changed[-1].any(), 1, 0),
+                                 (zs.start == 0 and changed[:, :, 0].any(), 0, -1),
+                                 (zs.stop == CHUNK_SIZE and changed[:, :, -1].any(), 0, 1)):
+                if edge:
+                    touched.add((cx + dx, cz + dz))
+        return touched
+
+    # BFS across chunk borders
+
+    def _get(self, channel, x, y, z):
+        if not 0 <= y < self.world.height:
+            return MAX_LIGHT if channel is self.sky and y >= self.world.height else 0
+        level = channel.level(chunk_coords(x, z), x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+        return level if level is not None else 0
+
+    def _set(self, channel, x, y, z, level, touched):
+        key = chunk_coords(x, z)
+        light = channel.get(key)
+        if light is None or not 0 <= y < self.world.height:
+            return
+        lx, lz = x % CHUNK_SIZE, z % CHUNK_SIZE
+        light[lx, y, lz] = level
+        touched.add(key)
+        # Faces of the neighboring chunk look into border cells
+        if lx == 0:
+            touched.add((key[0] - 1, key[1]))
+        elif lx == CHUNK_SIZE - 1:
+            touched.add((key[0] + 1, key[1]))
+        if lz == 0:
+            touched.add((key[0], key[1] - 1))
+        elif lz == CHUNK_SIZE - 1:
+            touched.add((key[0], key[1] + 1))
+
+    def _is_transparent(self, x, y, z):
+        return 0 <= y < self.world.height and self.transparent[self.world.get_block(x, y, z)]
+
+    def _propagate(self, channel, starts, touched):
+        queue = deque(starts)
+        while queue:
+            x, y, z = queue.popleft()
+            level = self._get(channel, x, y, z)
+            if level <= 1:
+                continue
+            for dx, dy, dz in NEIGHBORS:
+                nx, ny, nz = x + dx, y + dy, z + dz
+                if not self._is_transparent(nx, ny, nz):
+                    continue
+                falls = channel is self.sky and dy == -1 and level == MAX_LIGHT
+                new_level = level if falls else level - 1
+                if new_level > self._get(channel, nx, ny, nz):
+                    self._set(channel, nx, ny, nz, new_level, touched)
+                    queue.append((nx, ny, nz))
+
+    def _mark(self, touched):
+        for key in touched:
+            self.world.mark_dirty(*key, urgent=True)
@@ -0,0 +1,214 @@
+import numpy as np
+
+# How each mob type moves and fights; damage and health come from the game's mob_types
+MOB_BEHAVIORS = {
+    'zombie': {'speed': 2, 'chase_range': 10, 'attack_range': 1},
+    'skeleton': {'speed': 2, 'chase_range': 10, 'attack_range': 1},
+    'enderman': {'speed': 2, 'chase_range': 10, 'attack_range': 1, 'teleport_range': 5},
+    'ender_dragon': {'speed': 4, 'attack_range': 10, 'hovers': True},
+    'cow': {'speed': 2},
+}
+
+
+# Per-mob arrays: (name, shape per mob, dtype)
+MOB_FIELDS = (
+    ('types', (), np.int16),
+    ('positions', (3,), np.float32),
+    ('directions', (3,), np.float32),
+    ('wander_timers', (), np.float32),
+    ('attack_timers', (), np.float32),
+    ('breeding_cooldowns', (), np.float32),
+    ('health', (), np.float32),
+    ('pending_dt', (), np.float32),
+)
+
+
+class MobManager:
+    """All mobs as parallel NumPy arrays, updated for the whole population at once.
+
+    Mobs further than lod_distance from the player only think every
+    lod_interval ticks, catching up on the skipped time when they do. With a
+    FlowField, chasing mobs follow its paths over the terrain (walking
+    straight at the player only off the field) and endermen teleport to
+    spots the field can reach.
+    """
+
+    def __init__(self, mob_types, behaviors=MOB_BEHAVIORS, capacity=64, lod_distance=32,
+                 lod_interval=4, attack_cooldown=1, seed=None, flow_field=None):
+        self.type_names = list(mob_types)
+        self.type_ids = {name: i for i, name in enumerate(self.type_names)}
+        self.lod_distance = lod_distance
+        self.lod_interval = lod_interval
+        self.attack_cooldown = attack_cooldown
+        self.flow_field = flow_field
+        self.rng = np.random.default_rng(seed)
+        self.frame = 0
+
+        # Per-type tables indexed by type ID
+        def table(key, default=0):
+            return np.array([behaviors.get(name, {}).get(key, default) for name in self.type_names])
+        self.type_damage = np.array([mob_types[name]['damage'] for name in self.type_names], dtype=np.float32)
+        self.type_health = np.array([mob_types[name]['health'] for name in self.type_names], dtype=np.float32)
+        self.type_speed = table('speed', 2).astype(np.float32)
+        self.type_chase_range = table('chase_range').astype(np.float32)
+        self.type_attack_range = table('attack_range').astype(np.float32)
+        self.type_teleport_range = table('teleport_range').astype(np.float32)
+        self.type_hovers = table('hovers', False).astype(bool)
+
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        for name, shape, dtype in MOB_FIELDS:
+            array = np.zeros((capacity,) + shape, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:self.count] = old[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def _random_directions(self, n):
+        directions = np.zeros((n, 3), dtype=np.float32)
+        directions[:, 0] = self.rng.uniform(-1, 1, n)
+        directions[:, 2] = self.rng.uniform(-1, 1, n)
+        return directions / np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-6)
+
+    def spawn(self, mob_type, position):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        type_id = self.type_ids[mob_type]
+        self.types[i] = type_id
+        self.positions[i] = tuple(position)
+        self.directions[i] = self._random_directions(1)[0]
+        self.wander_timers[i] = self.rng.uniform(1, 3)
+        self.attack_timers[i] = 0
+        self.breeding_cooldowns[i] = 0
+        self.health[i] = self.type_health[type_id]
+        self.pending_dt[i] = 0
+        self.count += 1
+        return i
+
+    def mob_type(self, i):
+        return self.type_names[self.types[i]]
+
+    def of_type(self, mob_type):
+        return np.nonzero(self.types[:self.count] == self.type_ids[mob_type])[0]
+
+    def clear(self):
+        self.count = 0
+
+    def update(self, dt, player_position, time=0.0, flow_fields=None):
+        """Advance every mob; returns (damage dealt to the player, number of mobs that died).
+
+        With several players, pass their positions as a (players, 3) array
+        and, optionally, one FlowField (or None) per player in flow_fields.
+        Each mob then goes for its nearest player, and the damage is an
+        array with one total per player.
+        """
+        several = np.ndim(player_position[0]) > 0
+        players = np.array([tuple(position) for position in player_position] if several
+                           else [tuple(player_position)], dtype=np.float32)
+        fields = flow_fields if flow_fields is not None else [self.flow_field] * len(players)
+        n = self.count
+        if not n:
+            return (np.zeros(len(players)) if several else 0), 0
+        self.frame += 1
+        # Every mob targets its nearest player
+        all_offsets = players[None] - self.positions[:n, None]
+        all_distances = np.linalg.norm(all_offsets, axis=2)
+        nearest = np.argmin(all_distances, axis=1)
+        offsets = all_offsets[np.arange(n), nearest]
+        distances = all_distances[np.arange(n), nearest]
+
+        # AI level of detail: far mobs tick every lod_interval frames with the time they skipped
+        self.pending_dt[:n] += dt
+        active = (distances < self.lod_distance) | ((np.arange(n) + self.frame) % self.lod_interval == 0)
+        idx = np.nonzero(active)[0]
+        step = self.pending_dt[idx]
+        self.pending_dt[idx] = 0
+        types = self.types[idx]
+        dist = distances[idx]
+        speed = self.type_speed[types]
+
+        # Endermen close to the player sometimes teleport instead of acting
+        teleport = (dist < self.type_teleport_range[types]) & (self.rng.random(len(idx)) < 0.01)
+        chase = ~teleport & (dist < self.type_chase_range[types])
+        hover = self.type_hovers[types]
+        wander = ~teleport & ~chase & ~hover
+
+        # Flow fields are per player, so pathing mobs are grouped by their target
+        targets = nearest[idx]
+        for j, field in enumerate(fields):
+            group = teleport & (targets == j)
+            if not group.any():
+                continue
+            t = idx[group]
+            if field is None:
+                self.positions[t, 0] = self.rng.uniform(-10, 10, len(t))
+                self.positions[t, 2] = self.rng.uniform(-10, 10, len(t))
+            else:
+                spots = field.random_cells(self.rng, len(t), 2, self.type_teleport_range[types[group]].max())
+                if spots is not None:
+                    self.positions[t] = spots
+
+        if chase.any():
+            c = idx[chase]
+            heading = offsets[c] / np.maximum(dist[chase], 1e-6)[:, None]
+            landings = []
+            for j, field in enumerate(fields):
+                group = np.nonzero(targets[chase] == j)[0]
+                if field is None or not len(group):
+                    continue
+                flow, heights, on_field = field.sample(self.positions[c[group]])
+                heading[group[on_field]] = flow[on_field]
+                landings.append((c[group[on_field]], heights[on_field]))
+            self.positions[c] += heading * (speed[chase] * step[chase])[:, None]
+            for mobs, heights in landings:
+                self.positions[mobs, 1] = heights
+
+        if wander.any():
+            w = idx[wander]
+            self.wander_timers[w] -= step[wander]
+            turn = w[self.wander_timers[w] <= 0]
+            if len(turn):
+                self.directions[turn] = self._random_directions(len(turn))
+                self.wander_timers[turn] = self.rng.uniform(1, 3, len(turn))
+            self.positions[w] += self.directions[w] * (speed[wander] * step[wander])[:, None]
+
+        if hover.any():
+            self.positions[idx[hover], 1] += 6 * np.sin(time) * step[hover]
+
+        # Attacks use the distance from the start of the tick, like a single Mob.update did
+        attack = ~teleport & (dist < self.type_attack_range[types]) & (self.attack_timers[idx] <= 0)
+        damage = np.bincount(targets[attack], weights=self.type_damage[types[attack]], minlength=len(players))
+        self.attack_timers[idx[attack]] = self.attack_cooldown
+        self.attack_timers[idx] -= step
+        self.breeding_cooldowns[idx] -= step
+
+        return (damage if several else float(damage[0])), self._remove_dead()
+
+    def _remove_dead(self):
+        alive = self.health[:self.count] > 0
+        dead = int(self.count - alive.sum())
+        if dead:
+            keep = np.nonzero(alive)[0]
+            for name, _, _ in MOB_FIELDS:
+                array = getattr(self, name)
+                array[:len(keep)] = array[keep]
+            self.count = len(keep)
+        return dead
+
+    def breed_near(self, position, mob_type='cow', radius=3, cooldown=5, offset=(1, 0, 1)):
+        """Spawn a copy of the first ready mob of mob_type within radius; returns its index or None."""
+        candidates = self.of_type(mob_type)
+        if not len(candidates):
+            return None
+        position = np.asarray(tuple(position), dtype=np.float32)
+        near = np.linalg.norm(self.positions[candidates] - position, axis=1) < radius
+        ready = candidates[near & (self.breeding_cooldowns[candidates] <= 0)]
+        if not len(ready):
+            return None
+        parent = int(ready[0])
+        self.breeding_cooldowns[parent] = cooldown
+        return self.spawn(mob_type, self.positions[parent] + np.asarray(offset, dtype=np.float32))
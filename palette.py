@@ -0,0 +1,164 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Sections are full chunk width and SECTION_HEIGHT blocks high. Terrain
+# changes block type mostly along y, so short sections leave most of a
+# chunk as uniform stone or air and confine the mixed ones to the surface.
+SECTION_WIDTH = 16
+SECTION_HEIGHT = 4
+SECTION_SHAPE = (SECTION_WIDTH, SECTION_HEIGHT, SECTION_WIDTH)
+SECTION_VOLUME = SECTION_WIDTH * SECTION_HEIGHT * SECTION_WIDTH
+
+
+class PaletteSection:
+    """One chunk section as a palette of block IDs plus bit-packed indices into it.
+
+    Indices use as few bits as the palette needs and are packed into uint64
+    words without straddling them, so a read is one word load, a shift and a
+    mask. A section of a single block type (all air, all stone) stores just
+    that ID and is shared between chunks, so callers replace it rather than
+    set() on it; see uniform(). Index i is the C-order offset of (x, y, z).
+    """
+
+    __slots__ = ('palette', 'bits', 'words')
+
+    def __init__(self, palette, bits=0, words=None):
+        self.palette = palette
+        self.bits = bits
+        self.words = words
+
+    @classmethod
+    def uniform(cls, block):
+        section = _UNIFORM.get(block)
+        if section is None:
+            section = _UNIFORM[block] = cls([int(block)])
+        return section
+
+    @classmethod
+    def pack(cls, blocks):
+        blocks = blocks.ravel()
+        if blocks.min() == blocks.max():
+            return cls.uniform(int(blocks[0]))
+        # IDs are bytes, so a histogram finds the palette without sorting
+        palette = np.flatnonzero(np.bincount(blocks, minlength=256))
+        if len(palette) == 1:
+            return cls.uniform(int(palette[0]))
+        lookup = np.zeros(256, dtype=np.intp)
+        lookup[palette] = np.arange(len(palette))
+        bits = (len(palette) - 1).bit_length()
+        return cls(palette.tolist(), bits, _pack_indices(lookup[blocks], bits))
+
+    def unpack(self):
+        if not self.bits:
+            return np.full(SECTION_SHAPE, self.palette[0], dtype=np.uint8)
+        indices = _unpack_indices(self.words, self.bits)
+        return np.array(self.palette, dtype=np.uint8)[indices].reshape(SECTION_SHAPE)
+
+    @property
+    def is_uniform(self):
+        return not self.bits
+
+    def copy(self):
+        if not self.bits:
+            return self
+        return PaletteSection(list(self.palette), self.bits, self.words.copy())
+
+    def writable(self):
+        """A section that can be set() on: a private copy of a shared uniform one, otherwise itself."""
+        if self.bits:
+            return self
+        return PaletteSection(list(self.palette), 1, np.zeros(-(-SECTION_VOLUME // 64), dtype=np.uint64))
+
+    @property
+    def nbytes(self):
+        return len(self.palette) + (self.words.nbytes if self.words is not None else 0)
+
+    def get(self, i):
+        if not self.bits:
+            return self.palette[0]
+        # Python ints: shifts on numpy integers overflow or lose the top bit
+        i = int(i)
+        per_word = 64 // self.bits
+        word = int(self.words[i // per_word])
+        return self.palette[(word >> (i % per_word * self.bits)) & ((1 << self.bits) - 1)]
+
+    def set(self, i, block):
+        i, block = int(i), int(block)
+        # The palette never exceeds 256 entries, so the lookup is bounded
+        try:
+            index = self.palette.index(block)
+        except ValueError:
+            index = len(self.palette)
+            if index >= 1 << self.bits:
+                self._widen(index.bit_length())
+            self.palette.append(block)
+        per_word = 64 // self.bits
+        shift = i % per_word * self.bits
+        word = int(self.words[i // per_word])
+        self.words[i // per_word] = (word & ~(((1 << self.bits) - 1) << shift)) | (index << shift)
+
+    def _widen(self, bits):
+        # Repack the indices with room for a bigger palette
+        if self.bits:
+            indices = _unpack_indices(self.words, self.bits)
+        else:
+            indices = np.zeros(SECTION_VOLUME, dtype=np.int64)
+        self.bits = bits
+        self.words = _pack_indices(indices, bits)
+
+
+# Shared uniform sections by block ID
+_UNIFORM = {}
+
+
+def unpack_rows(sections, y0, y1):
+    """Rows y0 to y1 of a column of sections as one dense array, unpacking only the sections they cross."""
+    first = y0 // SECTION_HEIGHT
+    rows = np.concatenate([section.unpack() for section in sections[first:-(-y1 // SECTION_HEIGHT)]], axis=1)
+    return rows[:, y0 - first * SECTION_HEIGHT:y1 - first * SECTION_HEIGHT, :]
+
+
+def _pack_indices(indices, bits):
+    per_word = 64 // bits
+    padded = np.zeros(-(-SECTION_VOLUME // per_word) * per_word, dtype=np.uint64)
+    padded[:SECTION_VOLUME] = indices
+    shifts = np.arange(per_word, dtype=np.uint64) * np.uint64(bits)
+    return np.bitwise_or.reduce(padded.reshape(-1, per_word) << shifts, axis=1)
+
+
+def _unpack_indices(words, bits):
+    per_word = 64 // bits
+    shifts = np.arange(per_word, dtype=np.uint64) * np.uint64(bits)
+    indices = (words[:, None] >> shifts) & np.uint64((1 << bits) - 1)
+    return indices.ravel()[:SECTION_VOLUME].astype(np.intp)
+
+
+class ChunkCache:
+    """The chunks whose dense arrays are expanded, least recently used first.
+
+    Past limit, the oldest chunk is packed back into its palette sections.
+    """
+
+    def __init__(self, limit=64):
+        self.limit = limit
+        self.chunks = OrderedDict()
+
+    def touch(self, chunk):
+        key = id(chunk)
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.limit:
+            _, oldest = self.chunks.popitem(last=False)
+            oldest.compact()
+
+    def discard(self, chunk):
+        self.chunks.pop(id(chunk), None)
+
+    def compact_all(self):
+        chunks = list(self.chunks.values())
+        self.chunks.clear()
+        for chunk in chunks:
+            chunk.compact()
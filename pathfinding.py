@@ -0,0 +1,164 @@
+import heapq
+import math
+
+import numpy as np
+
+from voxelworld import CHUNK_SIZE, block_coords, chunk_coords, chunk_spans
+
+# Moves between columns: (dx, dz, cost)
+STEPS = tuple((dx, dz, math.hypot(dx, dz)) for dx in (-1, 0, 1) for dz in (-1, 0, 1) if dx or dz)
+UNREACHABLE = np.inf
+
+
+class FlowField:
+    """One shared path toward the player for every mob, over the walkable surface.
+
+    Each column within radius of the player is a node standing on its
+    highest solid block. A mob can step up max_climb blocks and drop
+    max_drop, and Dijkstra from the player's column gives every node its
+    distance and next step. Mobs only look up their column, so pathing
+    costs the same for five mobs or five hundred. The field is rebuilt only
+    when the player changes cell or a solid block within it changes.
+    """
+
+    def __init__(self, world, radius=16, max_climb=1, max_drop=3):
+        self.world = world
+        self.radius = radius
+        self.max_climb = max_climb
+        self.max_drop = max_drop
+        self.cell = None
+        self.stale = True
+        self.target = np.zeros(3, dtype=np.float32)
+        size = 2 * radius + 1
+        self.origin = (0, 0)
+        self.heights = np.zeros((size, size), dtype=np.int16)
+        self.distances = np.full((size, size), UNREACHABLE)
+        self.steps = np.zeros((size, size, 2), dtype=np.int8)
+        world.listeners.append(self)
+
+    # World listener hooks
+
+    def block_changed(self, x, y, z, old, new):
+        if self.world.solid[old] != self.world.solid[new] and self._covers(x, z):
+            self.stale = True
+
+    def chunk_added(self, chunk):
+        self._chunk_changed(chunk)
+
+    def chunk_changed(self, chunk):
+        self._chunk_changed(chunk)
+
+    def chunk_removed(self, chunk):
+        self._chunk_changed(chunk)
+
+    def _chunk_changed(self, chunk):
+        if self.cell is None:
+            return
+        low = chunk_coords(self.origin[0], self.origin[1])
+        high = chunk_coords(self.origin[0] + 2 * self.radius, self.origin[1] + 2 * self.radius)
+        if low[0] <= chunk.cx <= high[0] and low[1] <= chunk.cz <= high[1]:
+            self.stale = True
+
+    def _covers(self, x, z):
+        return (self.cell is not None and 0 <= x - self.origin[0] <= 2 * self.radius
+                and 0 <= z - self.origin[1] <= 2 * self.radius)
+
+    # Building
+
+    def update(self, player_position):
+        """Track the player; rebuilds the field if needed and returns whether it did."""
+        self.target[:] = tuple(player_position)
+        cell = block_coords(player_position)
+        if cell == self.cell and not self.stale:
+            return False
+        self.cell = cell
+        self.stale = False
+        self.origin = (cell[0] - self.radius, cell[2] - self.radius)
+        self._surface()
+        self._solve()
+        return True
+
+    def _surface(self):
+        # Standing height of each column (one above its highest solid block), -1 where there is none
+        size = 2 * self.radius + 1
+        self.heights[:] = -1
+        x0, z0 = self.origin
+        for cx, cz, xs, zs in chunk_spans(x0, z0, size, size):
+            chunk = self.world.chunks.get((cx, cz))
+            if chunk is None:
+                continue
+            solid = self.world.solid[chunk.blocks[xs.start:xs.stop, :, zs.start:zs.stop]]
+            top = chunk.height - np.argmax(solid[:, ::-1, :], axis=1)
+            ox, oz = cx * CHUNK_SIZE + xs.start - x0, cz * CHUNK_SIZE + zs.start - z0
+            self.heights[ox:ox + len(xs), oz:oz + len(zs)] = np.where(solid.any(axis=1), top, -1)
+
+    def _solve(self):
+        size = 2 * self.radius + 1
+        heights = self.heights.tolist()
+        distances = [[UNREACHABLE] * size for _ in range(size)]
+        steps = [[(0, 0)] * size for _ in range(size)]
+        start = (self.radius, self.radius)
+        if heights[start[0]][start[1]] < 0:
+            heights[start[0]][start[1]] = self.cell[1]
+        distances[start[0]][start[1]] = 0.0
+        queue = [(0.0, start[0], start[1])]
+        while queue:
+            distance, x, z = heapq.heappop(queue)
+            if distance > distances[x][z]:
+                continue
+            height = heights[x][z]
+            for dx, dz, cost in STEPS:
+                nx, nz = x + dx, z + dz
+                if not (0 <= nx < size and 0 <= nz < size) or heights[nx][nz] < 0:
+                    continue
+                # A mob at (nx, nz) walks toward (x, z): it climbs or drops the difference
+                climb = height - heights[nx][nz]
+                if climb > self.max_climb or -climb > self.max_drop:
+                    continue
+                # No cutting corners past a wall on a diagonal
+                if dx and dz and (heights[x][nz] > height or heights[nx][z] > height):
+                    continue
+                candidate = distance + cost
+                if candidate < distances[nx][nz]:
+                    distances[nx][nz] = candidate
+                    steps[nx][nz] = (-dx, -dz)
+                    heapq.heappush(queue, (candidate, nx, nz))
+        self.distances[:] = distances
+        self.steps[:] = steps
+
+    # Queries
+
+    def _columns(self, positions):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        ix = np.rint(positions[:, 0]).astype(np.int64) - self.origin[0]
+        iz = np.rint(positions[:, 2]).astype(np.int64) - self.origin[1]
+        size = 2 * self.radius + 1
+        inside = (ix >= 0) & (ix < size) & (iz >= 0) & (iz < size)
+        ix, iz = np.where(inside, ix, 0), np.where(inside, iz, 0)
+        on_field = inside & np.isfinite(self.distances[ix, iz])
+        return positions, ix, iz, on_field
+
+    def sample(self, positions):
+        """Per position: unit heading along the path, standing height, and whether the field reaches it.
+
+        Headings point at the center of the next column, or at the player
+        from the player's own column.
+        """
+        positions, ix, iz, on_field = self._columns(positions)
+        steps = self.steps[ix, iz]
+        goal = np.stack([ix + steps[:, 0] + self.origin[0], iz + steps[:, 1] + self.origin[1]], axis=1)
+        at_target = (steps == 0).all(axis=1)
+        goal = np.where(at_target[:, None], self.target[[0, 2]], goal).astype(np.float32)
+        headings = np.zeros_like(positions)
+        headings[:, [0, 2]] = goal - positions[:, [0, 2]]
+        headings /= np.maximum(np.linalg.norm(headings, axis=1, keepdims=True), 1e-6)
+        return headings, self.heights[ix, iz].astype(np.float32), on_field
+
+    def random_cells(self, rng, count, min_distance=0, max_distance=np.inf):
+        """count random standing positions whose path distance to the player lies in range, or None."""
+        xs, zs = np.nonzero((self.distances >= min_distance) & (self.distances <= max_distance))
+        if not len(xs):
+            return None
+        pick = rng.integers(len(xs), size=count)
+        xs, zs = xs[pick], zs[pick]
+        return np.stack([xs + self.origin[0], self.heights[xs, zs], zs + self.origin[1]], axis=1).astype(np.float32)
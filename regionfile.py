@@ -0,0 +1,179 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from voxelworld import CHUNK_SIZE
+
+# Region files hold 32x32 chunks. The header is followed by an offset table
+# with one (first sector, sector count, compressed length) entry per chunk;
+# chunk data is zlib-compressed and stored in whole 4 KiB sectors.
+REGION_SIZE = 32
+SECTOR_SIZE = 4096
+MAGIC = b'VXRG'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+ENTRY = struct.Struct('<III')
+HEADER_SECTORS = -(-(HEADER.size + REGION_SIZE * REGION_SIZE * ENTRY.size) // SECTOR_SIZE)
+
+
+def region_coords(cx, cz):
+    return cx // REGION_SIZE, cz // REGION_SIZE
+
+
+def compress_chunk(blocks):
+    return zlib.compress(np.ascontiguousarray(blocks, dtype=np.uint8).tobytes())
+
+
+def decompress_chunk(data, chunk_height):
+    blocks = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    return blocks.reshape(CHUNK_SIZE, chunk_height, CHUNK_SIZE).copy()
+
+
+class RegionFile:
+    """One region on disk. Reads go through a memory map, so only the sectors
+    of chunks actually loaded are paged in."""
+
+    def __init__(self, path, chunk_height):
+        self.path = path
+        self.chunk_height = chunk_height
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, chunk_height))
+                f.write(b'\0' * (HEADER_SECTORS * SECTOR_SIZE - HEADER.size))
+        self.file = open(path, 'r+b')
+        self.map = None
+        self._remap()
+        magic, version, height = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} region file")
+        if height != chunk_height:
+            raise ValueError(f"{path} stores chunks {height} blocks high, expected {chunk_height}")
+        self.entries = [ENTRY.unpack_from(self.map, HEADER.size + i * ENTRY.size)
+                        for i in range(REGION_SIZE * REGION_SIZE)]
+
+    def _remap(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _index(self, cx, cz):
+        return (cx % REGION_SIZE) + (cz % REGION_SIZE) * REGION_SIZE
+
+    def has_chunk(self, cx, cz):
+        return self.entries[self._index(cx, cz)][1] > 0
+
+    def read_compressed(self, cx, cz):
+        """The chunk's stored bytes as compress_chunk() made them, or None."""
+        sector, count, length = self.entries[self._index(cx, cz)]
+        if not count:
+            return None
+        start = sector * SECTOR_SIZE
+        return self.map[start:start + length]
+
+    def read_chunk(self, cx, cz):
+        data = self.read_compressed(cx, cz)
+        return decompress_chunk(data, self.chunk_height) if data is not None else None
+
+    def _find_free(self, count, exclude):
+        # First-fit run of unused sectors; the end of the file always fits
+        used = set(range(HEADER_SECTORS))
+        for i, (sector, n, _) in enumerate(self.entries):
+            if i != exclude:
+                used.update(range(sector, sector + n))
+        sector = HEADER_SECTORS
+        while any(s in used for s in range(sector, sector + count)):
+            sector += 1
+        return sector
+
+    def write_chunk(self, cx, cz, blocks):
+        self.write_compressed(cx, cz, compress_chunk(blocks))
+
+    def write_compressed(self, cx, cz, data):
+        """Store bytes from compress_chunk() as the chunk's data."""
+        index = self._index(cx, cz)
+        count = -(-len(data) // SECTOR_SIZE)
+        sector, old_count, _ = self.entries[index]
+        if old_count < count:
+            sector = self._find_free(count, exclude=index)
+        grows = (sector + count) * SECTOR_SIZE > len(self.map)
+        if grows:
+            # Some platforms refuse to extend a file that is still mapped
+            self.map.close()
+            self.map = None
+        self.file.seek(sector * SECTOR_SIZE)
+        self.file.write(data + b'\0' * (count * SECTOR_SIZE - len(data)))
+        self.entries[index] = (sector, count, len(data))
+        self.file.seek(HEADER.size + index * ENTRY.size)
+        self.file.write(ENTRY.pack(*self.entries[index]))
+        self.file.flush()
+        if grows:
+            self._remap()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+class WorldStorage:
+    """Chunk persistence for a VoxelWorld, as a directory of region files.
+
+    Reads and writes may come from different threads (an AutoSaver writes
+    from its worker), so each one holds a lock, but only around file
+    access: (de)compression happens outside it.
+    """
+
+    def __init__(self, directory, chunk_height):
+        self.directory = directory
+        self.chunk_height = chunk_height
+        self.regions = {}
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _region_path(self, rx, rz):
+        return os.path.join(self.directory, f'r.{rx}.{rz}.region')
+
+    def _region(self, cx, cz, create=False):
+        key = region_coords(cx, cz)
+        region = self.regions.get(key)
+        if region is None:
+            path = self._region_path(*key)
+            if not create and not os.path.exists(path):
+                return None
+            region = self.regions[key] = RegionFile(path, self.chunk_height)
+        return region
+
+    def has_chunk(self, cx, cz):
+        with self.lock:
+            region = self._region(cx, cz)
+            return region is not None and region.has_chunk(cx, cz)
+
+    def load_chunk(self, cx, cz):
+        with self.lock:
+            region = self._region(cx, cz)
+            data = region.read_compressed(cx, cz) if region is not None else None
+        return decompress_chunk(data, self.chunk_height) if data is not None else None
+
+    def save_chunk(self, chunk):
+        data = compress_chunk(chunk.blocks)
+        with self.lock:
+            self._region(chunk.cx, chunk.cz, create=True).write_compressed(chunk.cx, chunk.cz, data)
+        chunk.modified = False
+
+    def save(self, world):
+        """Write every chunk with unsaved edits; returns how many were written."""
+        modified = [chunk for chunk in world.chunks.values() if chunk.modified]
+        for chunk in modified:
+            self.save_chunk(chunk)
+        return len(modified)
+
+    def close(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.close()
+            self.regions.clear()
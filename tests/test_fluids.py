@@ -0,0 +1,74 @@
+import numpy as np
+
+from fluids import FluidEngine
+from voxelworld import AIR, VoxelWorld
+
+FLOOR = 10
+
+
+def flat_world():
+    world = VoxelWorld(['stone', 'water'])
+    floor = np.zeros((16, world.height, 16), dtype=np.uint8)
+    floor[:, :FLOOR, :] = world.block_ids['stone']
+    for cx in (-1, 0):
+        for cz in (-1, 0):
+            world.add_chunk(cx, cz, floor)
+    return world
+
+
+def settle(engine, limit=200):
+    ticks = 0
+    while engine.active:
+        engine.tick()
+        ticks += 1
+        assert ticks < limit, "water never settled"
+
+
+def water_cells(world):
+    water = world.block_ids['water']
+    return {(x, y, z) for x in range(-16, 16) for y in range(FLOOR, FLOOR + 3) for z in range(-16, 16)
+            if world.get_block(x, y, z) == water}
+
+
+def test_source_spreads_to_max_spread_and_drains_when_removed():
+    world = flat_world()
+    engine = FluidEngine(world, max_spread=3)
+    water = world.block_ids['water']
+
+    # Placing the source goes through set_block, so the engine hears of it as a listener
+    world.set_block(0, FLOOR, 0, 'water')
+    settle(engine)
+    cells = water_cells(world)
+    # A diamond of flowing water around the source, one level weaker per step
+    assert cells == {(x, FLOOR, z) for x in range(-3, 4) for z in range(-3, 4) if abs(x) + abs(z) <= 3}
+    assert (0, FLOOR, 0) not in engine.levels
+    assert engine.levels[(2, FLOOR, 1)] == 3
+    assert world.get_block(4, FLOOR, 0) == AIR
+
+    # Removing the source dries everything it fed
+    world.set_block(0, FLOOR, 0, None)
+    settle(engine)
+    assert water_cells(world) == set()
+    assert engine.levels == {}
+
+    # Water poured from above falls, then spreads on the floor
+    world.set_block(5, FLOOR + 2, 5, water)
+    settle(engine)
+    assert world.get_block(5, FLOOR + 1, 5) == water
+    assert world.get_block(5, FLOOR, 5) == water
+    assert world.get_block(6, FLOOR, 5) == water
+    assert world.get_block(6, FLOOR + 1, 5) == AIR
+
+
+def test_walls_hold_water_and_unloading_forgets_it():
+    world = flat_world()
+    engine = FluidEngine(world, max_spread=7)
+    for z in range(-16, 16):
+        world.set_block(2, FLOOR, z, 'stone')
+    world.set_block(0, FLOOR, 0, 'water')
+    settle(engine)
+    assert all(x < 2 for x, _, _ in water_cells(world))
+
+    world.remove_chunk(-1, -1)
+    assert not any(x < 0 and z < 0 for x, _, z in engine.levels)
+    assert not any(x < 0 and z < 0 for x, _, z in engine.active)
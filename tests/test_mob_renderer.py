@@ -0,0 +1,81 @@
+"""Smoke test of the instanced mob path against a real Panda3D offscreen buffer.
+
+Skipped where ursina/panda3d are missing or no GL context can be opened
+(p3headlessgl needs EGL or Mesa).
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('panda3d')
+pytest.importorskip('ursina')
+
+from panda3d.core import PNMImage, Point2, Point3, loadPrcFileData  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    loadPrcFileData('', 'load-display p3headlessgl\nwindow-type offscreen\naudio-library-name null')
+    from ursina import Ursina
+    try:
+        app = Ursina(window_type='offscreen', development_mode=False)
+    except Exception as error:
+        pytest.skip(f"no offscreen GL context: {error}")
+    if app.win is None:
+        pytest.skip("no offscreen GL context")
+    return app
+
+
+def screen_color(app, position):
+    from ursina import camera
+    projected = Point2()
+    assert camera.lens.project(app.cam.get_relative_point(app.render, Point3(*position)), projected)
+    image = PNMImage()
+    app.win.get_screenshot(image)
+    x = int((projected.x + 1) / 2 * (image.get_x_size() - 1))
+    y = int((1 - projected.y) / 2 * (image.get_y_size() - 1))
+    return tuple(round(value, 2) for value in image.get_xel(x, y))
+
+
+def test_instances_draw_in_one_call_per_type(app):
+    from ursina import Vec3, camera
+
+    from voxelnet import MOB_RECORD, RemoteMobs
+    from voxelrender import MobRenderer
+
+    mobs = RemoteMobs(['zombie', 'cow'])
+    records = np.zeros(5, dtype=MOB_RECORD)
+    records['type'] = [0, 0, 1, 1, 1]
+    records['x'] = [-3, 3, 0, 0, 0]
+    records['y'] = [0, 0, 2, -2, 0]
+    mobs.apply(records)
+    # Capacity 2 makes the cow batch grow its buffer on the first update
+    renderer = MobRenderer(mobs, {'zombie': (0, 1, 0, 1), 'cow': (1, 0, 0, 1)}, capacity=2)
+    renderer.update()
+
+    assert renderer.draw_calls() == 2
+    zombies, cows = renderer.batches[0], renderer.batches[1]
+    assert zombies.entity.model.get_instance_count() == 2
+    assert cows.entity.model.get_instance_count() == 3
+    assert cows.capacity >= 3
+    # Two texels per instance: (x, y, z, scale), then (r, g, b, a)
+    assert cows.texture.get_x_size() == 2 * cows.capacity
+    assert cows.buffer[:6].tolist() == [[0, 2, 0, 1], [1, 0, 0, 1], [0, -2, 0, 1], [1, 0, 0, 1],
+                                        [0, 0, 0, 1], [1, 0, 0, 1]]
+
+    camera.position = (0, 0, -20)
+    camera.look_at(Vec3(0, 0, 0))
+    for _ in range(2):
+        app.step()
+    assert screen_color(app, (-3, 0, 0)) == (0, 1, 0)
+    assert screen_color(app, (3, 0, 0)) == (0, 1, 0)
+    assert screen_color(app, (0, 2, 0)) == (1, 0, 0)
+    assert screen_color(app, (0, -2, 0)) == (1, 0, 0)
+    background = screen_color(app, (-1.5, 1.5, 0))
+    assert background not in ((0, 1, 0), (1, 0, 0))
+
+    # A type with no mobs left is disabled rather than drawn empty
+    records = records[2:]
+    mobs.apply(records)
+    renderer.update()
+    assert renderer.draw_calls() == 1
+    assert not zombies.entity.enabled
@@ -0,0 +1,25 @@
+import numpy as np
+
+from mobsystem import MobManager
+
+MOB_TYPES = {'zombie': {'damage': 3, 'health': 10}, 'cow': {'damage': 0, 'health': 5}}
+
+
+def test_mobs_chase_and_hurt_their_nearest_player():
+    manager = MobManager(MOB_TYPES, seed=0)
+    near_first = manager.spawn('zombie', (0.5, 0, 0.5))
+    near_second = manager.spawn('zombie', (40, 0, 5))
+    players = np.array([(0, 0, 0), (40, 0, 0)], dtype=np.float32)
+
+    damage, deaths = manager.update(0.1, players)
+    assert deaths == 0
+    # Only the first zombie is in reach; its damage goes to the first player alone
+    assert damage.tolist() == [3, 0]
+    # The second zombie walks toward the second player, not the first
+    assert manager.positions[near_second, 2] < 5
+    assert manager.positions[near_second, 0] == 40
+
+    # One player still gets plain numbers back
+    damage, _ = manager.update(0.1, (0, 0, 0))
+    assert isinstance(damage, float)
+    assert manager.positions[near_first, 0] <= 0.5
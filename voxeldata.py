@@ -0,0 +1,44 @@
+"""Block, tool and mob tables shared by CursorCRAFT4K, voxelserver and the headless tools.
+
+Nothing here opens a window, so the server and the benchmarks load the
+same content as the game. Colors stay in the game, keyed by these names.
+"""
+from blockregistry import BlockRegistry
+
+# Block types in ID order; saves and the network protocol depend on it
+BLOCK_NAMES = ['grass', 'dirt', 'stone', 'wood', 'leaves', 'water', 'sand',
+               'end_stone', 'obsidian', 'bedrock', 'cobblestone', 'glowstone']
+
+# Block hardness (time to break with bare hands)
+BLOCK_HARDNESS = {
+    'grass': 1, 'dirt': 1, 'stone': 3, 'wood': 2, 'leaves': 1,
+    'water': 0, 'sand': 1, 'end_stone': 3, 'obsidian': 50, 'bedrock': 100,
+    'cobblestone': 3, 'glowstone': 1
+}
+
+# Block light given off by each light source
+LIGHT_EMISSION = {'glowstone': 15}
+
+# Tools and weapons
+TOOLS = {
+    'wooden_pickaxe': {'speed': 2, 'suitable_for': ['stone', 'cobblestone']},
+    'wooden_axe': {'speed': 2, 'suitable_for': ['wood']},
+    'wooden_shovel': {'speed': 2, 'suitable_for': ['dirt', 'grass', 'sand']},
+    'wooden_sword': {'speed': 1, 'damage': 4},
+}
+
+# Mob stats; how each type moves is in mobsystem.MOB_BEHAVIORS
+MOB_TYPES = {
+    'zombie': {'attack_type': 'melee', 'damage': 3, 'health': 10},
+    'skeleton': {'attack_type': 'ranged', 'damage': 2, 'health': 10},
+    'enderman': {'attack_type': 'melee', 'damage': 4, 'health': 20},
+    'ender_dragon': {'attack_type': 'melee', 'damage': 10, 'health': 100},
+    'cow': {'attack_type': None, 'damage': 0, 'health': 5},
+}
+
+
+def make_block_registry(colors=None):
+    """BlockRegistry of BLOCK_NAMES with the tables above; colors maps block names to colors."""
+    colors = colors or {}
+    return BlockRegistry({name: colors.get(name) for name in BLOCK_NAMES}, hardness=BLOCK_HARDNESS,
+                         tools=TOOLS, emission=LIGHT_EMISSION)
@@ -0,0 +1,287 @@
+import select
+import socket
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from voxelworld import CHUNK_SIZE
+
+# Every message is one frame: a (body length, message type) header and a
+# binary body. Frames for a tick are queued into one buffer and sent with
+# as few socket writes as the connection allows.
+PROTOCOL_VERSION = 2
+DEFAULT_PORT = 25575
+HEADER = struct.Struct('<IB')
+MAX_FRAME = 1 << 24
+
+# Client to server
+HELLO = 1
+POSITION = 2
+EDITS = 3
+# Server to client
+WELCOME = 10
+CHUNK = 11
+UNLOAD = 12
+BLOCKS = 13
+MOBS = 14
+DAMAGE = 15
+
+HELLO_BODY = struct.Struct('<H')
+# Version, chunk height, client ID, spawn point, block and mob name counts;
+# the names follow, NUL-separated, blocks first
+WELCOME_HEAD = struct.Struct('<HHIfffBB')
+POSITION_BODY = struct.Struct('<fff')
+# Damage the server's mobs dealt this client's player
+DAMAGE_BODY = struct.Struct('<f')
+CHUNK_KEY = struct.Struct('<ii')
+# Tick number and record count ahead of a batch of records
+BATCH_HEAD = struct.Struct('<II')
+
+BLOCK_RECORD = np.dtype([('x', '<i4'), ('y', '<u2'), ('z', '<i4'), ('block', 'u1')])
+MOB_RECORD = np.dtype([('type', 'u1'), ('x', '<f4'), ('y', '<f4'), ('z', '<f4')])
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def frame(kind, body=b''):
+    return HEADER.pack(len(body), kind) + body
+
+
+def encode_welcome(client_id, height, spawn, block_names, mob_names):
+    # Block 0 (air) has no name and goes as an empty string
+    names = '\0'.join([name or '' for name in block_names] + list(mob_names)).encode()
+    return frame(WELCOME, WELCOME_HEAD.pack(PROTOCOL_VERSION, height, client_id, *spawn,
+                                            len(block_names), len(mob_names)) + names)
+
+
+def decode_welcome(body):
+    version, height, client_id, x, y, z, block_count, mob_count = WELCOME_HEAD.unpack_from(body)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"server speaks protocol {version}, expected {PROTOCOL_VERSION}")
+    names = body[WELCOME_HEAD.size:].decode().split('\0')
+    return client_id, height, (x, y, z), names[:block_count], names[block_count:block_count + mob_count]
+
+
+def encode_chunk(cx, cz, blocks):
+    return frame(CHUNK, CHUNK_KEY.pack(cx, cz) + zlib.compress(np.ascontiguousarray(blocks).tobytes(), 1))
+
+
+def decode_chunk(body, height):
+    cx, cz = CHUNK_KEY.unpack_from(body)
+    blocks = np.frombuffer(zlib.decompress(body[CHUNK_KEY.size:]), dtype=np.uint8)
+    return cx, cz, blocks.reshape(CHUNK_SIZE, height, CHUNK_SIZE)
+
+
+def encode_records(kind, tick, records):
+    return frame(kind, BATCH_HEAD.pack(tick, len(records)) + records.tobytes())
+
+
+def decode_records(body, dtype):
+    tick, count = BATCH_HEAD.unpack_from(body)
+    if len(body) != BATCH_HEAD.size + count * dtype.itemsize:
+        raise ProtocolError(f"batch of {count} records does not fit a {len(body)} byte body")
+    return tick, np.frombuffer(body, dtype=dtype, count=count, offset=BATCH_HEAD.size)
+
+
+def block_records(changes):
+    """BLOCK_RECORD array from ((x, y, z), block) pairs."""
+    records = np.zeros(len(changes), dtype=BLOCK_RECORD)
+    if len(changes):
+        positions = np.array([position for position, _ in changes]).reshape(-1, 3)
+        records['x'], records['y'], records['z'] = positions.T
+        records['block'] = [block for _, block in changes]
+    return records
+
+
+class Connection:
+    """A non-blocking socket with framed input and a queued output buffer."""
+
+    def __init__(self, sock, max_outbox=8 << 20):
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.max_outbox = max_outbox
+        self.closed = False
+
+    def send(self, data):
+        self.outbox += data
+        if len(self.outbox) > self.max_outbox:
+            # A peer that stopped reading would otherwise grow this without bound
+            self.close()
+
+    def flush(self):
+        while self.outbox and not self.closed:
+            try:
+                sent = self.sock.send(self.outbox)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self.close()
+                return
+            del self.outbox[:sent]
+
+    def receive(self):
+        """Read what has arrived; returns the complete (type, body) frames."""
+        while not self.closed:
+            try:
+                data = self.sock.recv(1 << 16)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self.close()
+                break
+            if not data:
+                self.close()
+                break
+            self.inbox += data
+        frames = []
+        offset = 0
+        while len(self.inbox) - offset >= HEADER.size:
+            length, kind = HEADER.unpack_from(self.inbox, offset)
+            if length > MAX_FRAME:
+                self.close()
+                break
+            end = offset + HEADER.size + length
+            if end > len(self.inbox):
+                break
+            frames.append((kind, bytes(self.inbox[offset + HEADER.size:end])))
+            offset = end
+        del self.inbox[:offset]
+        return frames
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.sock.close()
+
+
+class RemoteMobs:
+    """Mob state received from a server, laid out like a MobManager for MobRenderer."""
+
+    def __init__(self, type_names):
+        self.type_names = type_names
+        self.types = np.zeros(0, dtype=np.int16)
+        self.positions = np.zeros((0, 3), dtype=np.float32)
+        self.count = 0
+
+    def apply(self, records):
+        self.types = records['type'].astype(np.int16)
+        self.positions = np.stack([records['x'], records['y'], records['z']], axis=1)
+        self.count = len(records)
+
+
+class VoxelClient:
+    """Joins a VoxelServer and mirrors its world into a local VoxelWorld.
+
+    Chunks arrive whole; after that only batched block changes do, and
+    each is applied with set_block, so the renderer remeshes just the
+    chunks they touch. Local edits go through set_block() here: they show
+    at once and reach the server once per update(). The server's copy
+    wins: it echoes every edit it accepts and corrects any it refuses.
+    Block and mob IDs are matched to the server's by name. Mobs run on the
+    server, and the damage they deal our player adds up for take_damage().
+    """
+
+    def __init__(self, world, host='127.0.0.1', port=DEFAULT_PORT, renderer=None, timeout=5):
+        self.world = world
+        self.renderer = renderer
+        self.connection = Connection(socket.create_connection((host, port), timeout=timeout))
+        self.connection.send(frame(HELLO, HELLO_BODY.pack(PROTOCOL_VERSION)))
+        self.edits = []
+        self.last_position = None
+        self.tick = 0
+        self.damage = 0.0
+        self._await_welcome(timeout)
+
+    def _await_welcome(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.connection.flush()
+            select.select([self.connection.sock], [], [], 0.05)
+            frames = self.connection.receive()
+            if frames and frames[0][0] == WELCOME:
+                welcome = decode_welcome(frames[0][1])
+                self.client_id, height, self.spawn_point, block_names, mob_names = welcome
+                if height != self.world.height:
+                    raise ProtocolError(
+                        f"server chunks are {height} blocks high, expected {self.world.height}")
+                # Server block ID -> local block ID, and back
+                self.to_local = np.array([self.world.block_ids.get(name, 0) for name in block_names],
+                                         dtype=np.uint8)
+                self.to_server = np.zeros(256, dtype=np.uint8)
+                # Where names share a local ID (unknown ones all map to air), the first wins
+                self.to_server[self.to_local[::-1]] = np.arange(len(block_names), dtype=np.uint8)[::-1]
+                self.mobs = RemoteMobs(mob_names)
+                self._handle(frames[1:])
+                return
+            if self.connection.closed:
+                break
+        raise ProtocolError("no welcome from server")
+
+    def take_damage(self):
+        """Damage mobs dealt our player since the last call."""
+        damage, self.damage = self.damage, 0.0
+        return damage
+
+    @property
+    def connected(self):
+        return not self.connection.closed
+
+    def set_block(self, x, y, z, block):
+        """Edit locally now and send the edit to the server with the next update()."""
+        block = self.world.block_id(block)
+        # Chunks come from the server; set_block refuses edits outside the ones it sent
+        if self.world.set_block(x, y, z, block):
+            self.edits.append(((x, y, z), int(self.to_server[block])))
+
+    def update(self, position=None):
+        """Apply what the server sent and send our position and edits; call once per frame.
+
+        Pass no position while the player is somewhere the server does not
+        know about, such as another dimension; the server keeps the last one.
+        """
+        self._handle(self.connection.receive())
+        if position is not None:
+            position = tuple(float(value) for value in position)
+            if position != self.last_position:
+                self.last_position = position
+                self.connection.send(frame(POSITION, POSITION_BODY.pack(*position)))
+        if self.edits:
+            self.connection.send(encode_records(EDITS, self.tick, block_records(self.edits)))
+            self.edits = []
+        self.connection.flush()
+
+    def _handle(self, frames):
+        world = self.world
+        for kind, body in frames:
+            if kind == CHUNK:
+                cx, cz, blocks = decode_chunk(body, world.height)
+                world.add_chunk(cx, cz, self.to_local[blocks])
+            elif kind == UNLOAD:
+                cx, cz = CHUNK_KEY.unpack_from(body)
+                world.remove_chunk(cx, cz)
+                if self.renderer is not None:
+                    self.renderer.remove(cx, cz)
+            elif kind == BLOCKS:
+                self.tick, records = decode_records(body, BLOCK_RECORD)
+                blocks = self.to_local[records['block']].tolist()
+                for x, y, z, block in zip(records['x'].tolist(), records['y'].tolist(),
+                                          records['z'].tolist(), blocks):
+                    # Our own edits come back unchanged; skip them rather than remesh again
+                    if world.is_loaded(x, z) and world.get_block(x, y, z) != block:
+                        world.set_block(x, y, z, block)
+            elif kind == MOBS:
+                self.tick, records = decode_records(body, MOB_RECORD)
+                self.mobs.apply(records)
+            elif kind == DAMAGE:
+                self.damage += DAMAGE_BODY.unpack_from(body)[0]
+
+    def close(self):
+        self.connection.flush()
+        self.connection.close()
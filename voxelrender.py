@@ -0,0 +1,223 @@
+import time
+
+import numpy as np
+from panda3d.core import GeomEnums, OmniBoundingVolume, Texture
+from ursina import Entity, Mesh, Shader, destroy, scene
+
+from culling import ChunkCuller, Frustum
+from voxelworld import CHUNK_SIZE, build_chunk_mesh
+
+# Downsampling factor of each level of detail, nearest first
+LOD_FACTORS = (1, 2, 4)
+
+
+def camera_frustum(camera, far=None):
+    """The view frustum of an ursina camera, in world space."""
+    lens = camera.lens
+    fov = lens.get_fov()
+    return Frustum(camera.world_position, camera.forward, camera.right, camera.up,
+                   (fov[0], fov[1]), far or lens.get_far())
+
+
+# One Entity (and one draw call) per chunk instead of one per block
+class ChunkRenderer:
+    def __init__(self, world, block_colors, parent=scene, collider=None, mesh_mode='greedy',
+                 lod_distances=(48, 96), lod_hysteresis=8, light_engine=None):
+        self.world = world
+        # Indexed by block ID, slot 0 (air) is never drawn
+        self.block_colors = block_colors
+        self.parent = parent
+        self.collider = collider
+        self.mesh_mode = mesh_mode
+        self.entities = {}
+        # (naive, built) triangle counts per chunk
+        self.triangle_counts = {}
+        # Distances (in blocks) past which chunks drop to the next level of
+        # detail; a chunk must cross a boundary by lod_hysteresis to switch
+        self.lod_distances = lod_distances
+        self.lod_hysteresis = lod_hysteresis
+        self.lod_levels = {}
+        # Optional LightEngine whose light is baked into the vertex colors
+        self.light_engine = light_engine
+        # Chunks that cull() found could be on screen, None until it first runs
+        self.culler = ChunkCuller(world)
+        self.visible = None
+        self.drawn = 0
+
+    def build(self, chunk):
+        old = self.entities.pop((chunk.cx, chunk.cz), None)
+        if old:
+            destroy(old)
+        self.world.discard_dirty(chunk.cx, chunk.cz)
+        self.culler.update_chunk(chunk)
+        lod = LOD_FACTORS[self.lod_levels.get((chunk.cx, chunk.cz), 0)]
+        light = self.light_engine.padded_light(chunk) if self.light_engine and lod == 1 else None
+        mesh = build_chunk_mesh(self.world, chunk, self.block_colors, self.mesh_mode, lod, light)
+        self.triangle_counts[(chunk.cx, chunk.cz)] = (mesh.naive_triangles, len(mesh.triangles) // 3)
+        if not mesh.triangles:
+            return None
+        entity = Entity(
+            parent=self.parent,
+            model=Mesh(vertices=mesh.vertices, triangles=mesh.triangles, colors=mesh.colors, static=True),
+            position=chunk.origin,
+            collider=self.collider,
+            enabled=self.visible is None or (chunk.cx, chunk.cz) in self.visible
+        )
+        self.entities[(chunk.cx, chunk.cz)] = entity
+        return entity
+
+    def remesh_steps(self):
+        """Remesh queued chunks as a resumable job, yielding after each one."""
+        chunk = self.world.pop_dirty()
+        while chunk is not None:
+            self.build(chunk)
+            yield chunk
+            chunk = self.world.pop_dirty()
+
+    def refresh(self, budget_ms=None):
+        """Remesh queued chunks until budget_ms is spent (at least one per call); returns how many."""
+        start = time.perf_counter()
+        built = 0
+        for _ in self.remesh_steps():
+            built += 1
+            if budget_ms is not None and (time.perf_counter() - start) * 1000 >= budget_ms:
+                break
+        return built
+
+    def update_lod(self, camera_position):
+        """Pick each chunk's level of detail by distance and queue the ones that changed for remeshing."""
+        x, z = camera_position[0], camera_position[2]
+        last = len(self.lod_distances)
+        for key in self.world.chunks:
+            center_x = (key[0] + 0.5) * CHUNK_SIZE - 0.5
+            center_z = (key[1] + 0.5) * CHUNK_SIZE - 0.5
+            distance = ((center_x - x) ** 2 + (center_z - z) ** 2) ** 0.5
+            current = level = self.lod_levels.get(key, 0)
+            while level < last and distance > self.lod_distances[level] + self.lod_hysteresis:
+                level += 1
+            while level > 0 and distance < self.lod_distances[level - 1] - self.lod_hysteresis:
+                level -= 1
+            if level != current:
+                self.lod_levels[key] = level
+                self.world.mark_dirty(*key)
+
+    def cull(self, frustum):
+        """Draw only the chunk meshes that could be on screen from frustum; returns how many are drawn."""
+        self.visible = self.culler.visible_chunks(frustum)
+        drawn = 0
+        for key, entity in self.entities.items():
+            shown = key in self.visible
+            if entity.enabled != shown:
+                entity.enabled = shown
+            drawn += shown
+        self.drawn = drawn
+        return drawn
+
+    def cull_report(self):
+        culler = self.culler
+        return (f"chunks: {self.drawn}/{len(self.entities)} meshes submitted, "
+                f"{culler.total - culler.in_view} outside view, {culler.in_view - culler.visible} occluded")
+
+    def remove(self, cx, cz):
+        self.lod_levels.pop((cx, cz), None)
+        self.triangle_counts.pop((cx, cz), None)
+        entity = self.entities.pop((cx, cz), None)
+        if entity:
+            destroy(entity)
+
+    def clear(self):
+        for entity in self.entities.values():
+            destroy(entity)
+        self.entities.clear()
+        self.triangle_counts.clear()
+        self.lod_levels.clear()
+        self.visible = None
+
+    def report(self):
+        naive = sum(counts[0] for counts in self.triangle_counts.values())
+        built = sum(counts[1] for counts in self.triangle_counts.values())
+        saved = 100 * (1 - built / naive) if naive else 0
+        return (f"{len(self.entities)} chunk meshes: {built} triangles "
+                f"({self.mesh_mode}), {naive} without culling ({saved:.0f}% saved)")
+
+
+# Each instance reads two texels from a float32 buffer texture: position
+# and scale, then color. The cube is drawn once per mob type with
+# gl_InstanceID picking the instance.
+MOB_INSTANCE_SHADER = Shader(
+    language=Shader.GLSL,
+    vertex='''#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer instances;
+in vec4 p3d_Vertex;
+out vec4 instance_color;
+
+void main() {
+    vec4 placement = texelFetch(instances, gl_InstanceID * 2);
+    instance_color = texelFetch(instances, gl_InstanceID * 2 + 1);
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(p3d_Vertex.xyz * placement.w + placement.xyz, 1.0);
+}
+''',
+    fragment='''#version 140
+in vec4 instance_color;
+out vec4 fragment_color;
+
+void main() {
+    fragment_color = instance_color;
+}
+''',
+)
+
+
+class _MobBatch:
+    # One instanced cube Entity and its instance buffer for a single mob type
+    def __init__(self, parent, capacity):
+        self.entity = Entity(parent=parent, model='cube', shader=MOB_INSTANCE_SHADER, enabled=False)
+        # Instances sit anywhere in the world, so the cube's own bounds must not cull them
+        self.entity.model.node().set_bounds(OmniBoundingVolume())
+        self.entity.model.node().set_final(True)
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity * 2, 4), dtype=np.float32)
+        self.texture = Texture('mob_instances')
+        self.texture.setup_buffer_texture(capacity * 2, Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+        self.entity.set_shader_input('instances', self.texture)
+
+
+# Draws the mobs of a MobManager with hardware instancing: one draw call per
+# mob type however many mobs there are, fed from the manager's arrays
+class MobRenderer:
+    def __init__(self, mob_manager, type_colors, parent=scene, type_scales=None, capacity=64):
+        self.mob_manager = mob_manager
+        self.type_colors = np.array([tuple(type_colors[name]) for name in mob_manager.type_names], dtype=np.float32)
+        self.type_scales = np.array([(type_scales or {}).get(name, 1) for name in mob_manager.type_names],
+                                    dtype=np.float32)
+        self.parent = parent
+        self.capacity = capacity
+        self.batches = {}
+
+    def update(self):
+        manager = self.mob_manager
+        types = manager.types[:manager.count]
+        for type_id in set(np.unique(types).tolist()) | set(self.batches):
+            index = np.nonzero(types == type_id)[0]
+            batch = self.batches.get(type_id)
+            if batch is None:
+                batch = self.batches[type_id] = _MobBatch(self.parent, self.capacity)
+            count = len(index)
+            batch.entity.enabled = count > 0
+            if not count:
+                continue
+            if count > batch.capacity:
+                batch.allocate(max(count, 2 * batch.capacity))
+            # Pack (x, y, z, scale) and (r, g, b, a) per instance and upload them in one go
+            batch.buffer[0:2 * count:2, :3] = manager.positions[index]
+            batch.buffer[0:2 * count:2, 3] = self.type_scales[type_id]
+            batch.buffer[1:2 * count:2] = self.type_colors[type_id]
+            batch.texture.set_ram_image(batch.buffer.tobytes())
+            batch.entity.model.set_instance_count(count)
+
+    def draw_calls(self):
+        return sum(1 for batch in self.batches.values() if batch.entity.enabled)
@@ -0,0 +1,327 @@
+"""Authoritative voxel world server for CursorCRAFT4K multiplayer.
+
+Owns the chunk store (generated from the seed, with edits saved to region
+files) and runs water and mobs. Clients get every chunk around them whole
+when they come near it, then only batched block changes and mob state
+each tick.
+
+    python voxelserver.py --port 25575 --seed 1337
+    python CursorCRAFT4K.py --connect 127.0.0.1:25575
+"""
+import argparse
+import selectors
+import socket
+import struct
+import time
+
+import numpy as np
+
+from autosave import AutoSaver
+from chunkstreamer import ChunkStreamer, chunks_around, in_radius
+from fluids import FluidEngine
+from mobsystem import MobManager
+from pathfinding import FlowField
+from regionfile import WorldStorage
+from voxelnet import (
+    BLOCK_RECORD, BLOCKS, CHUNK_KEY, DAMAGE, DAMAGE_BODY, DEFAULT_PORT, EDITS, HELLO, HELLO_BODY, MOB_RECORD,
+    MOBS, POSITION, POSITION_BODY, PROTOCOL_VERSION, UNLOAD, Connection, ProtocolError, block_records, decode_records,
+    encode_chunk, encode_records, encode_welcome, frame,
+)
+from voxeldata import MOB_TYPES, make_block_registry
+from voxelworld import CHUNK_HEIGHT, VoxelWorld, chunk_coords
+from worldgen import ChunkGenerator
+
+class _Client:
+    def __init__(self, client_id, connection):
+        self.id = client_id
+        self.connection = connection
+        self.joined = False
+        self.position = None
+        self.center = None
+        # Chunks this client holds, and the ones it should, nearest first
+        self.known = set()
+        self.wanted = []
+        self.flow_field = None
+
+
+class VoxelServer:
+    """Runs a world at tick_rate ticks per second for every connected client.
+
+    Sockets are non-blocking and polled between ticks. Edits clients send
+    are applied at the next tick, and everything that tick changed goes
+    out as one BLOCKS frame shared by all clients. Each client receives at
+    most chunks_per_tick new chunks per tick, so joins don't starve the
+    loop, and a client that stops reading is dropped once its output
+    backs up. Each mob goes for its nearest client, and the damage it deals
+    is sent to that client alone. make_flow_field(), if given, builds each
+    joining client its own FlowField for the mobs chasing it.
+
+    storage is an AutoSaver, so edited chunks are written off the loop.
+    Chunks are loaded, generated and unloaded by a ChunkStreamer that keeps
+    every chunk some client still holds or is near.
+    """
+
+    def __init__(self, world, generate, host='127.0.0.1', port=DEFAULT_PORT, storage=None,
+                 spawn_point=(0, 25, 0), tick_rate=20, load_radius=4, unload_radius=6, chunks_per_tick=4,
+                 executor=None, fluid_engine=None, mob_manager=None, make_flow_field=None):
+        self.world = world
+        self.storage = storage
+        self.spawn_point = spawn_point
+        self.tick_interval = 1 / tick_rate
+        self.chunks_per_tick = chunks_per_tick
+        self.streamer = ChunkStreamer(world, None, generate, load_radius, unload_radius,
+                                      executor=executor, storage=storage, keep=self._needed)
+        self.fluid_engine = fluid_engine
+        self.mob_manager = mob_manager
+        self.make_flow_field = make_flow_field
+        self.clients = {}
+        self.next_id = 1
+        self.edits = []
+        # Blocks changed this tick (last write wins) and chunks changed wholesale
+        self.changes = {}
+        self.resend = set()
+        self.tick_number = 0
+        self.running = False
+        world.listeners.append(self)
+
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+    # World listener hooks
+
+    def block_changed(self, x, y, z, old, new):
+        self.changes[(x, y, z)] = new
+
+    def chunk_changed(self, chunk):
+        self.resend.add((chunk.cx, chunk.cz))
+
+    # Connections
+
+    def poll(self, timeout=0):
+        """Accept connections and read what clients sent, waiting up to timeout seconds."""
+        for key, _ in self.selector.select(timeout):
+            if key.data is None:
+                self._accept()
+                continue
+            client = key.data
+            try:
+                for kind, body in client.connection.receive():
+                    self._handle(client, kind, body)
+            except (struct.error, ValueError, ProtocolError):
+                # A malformed frame costs that client its connection, not the server
+                client.connection.close()
+            if client.connection.closed:
+                self._drop(client)
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        client = _Client(self.next_id, Connection(sock))
+        self.next_id += 1
+        self.clients[client.id] = client
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def _drop(self, client):
+        if self.clients.pop(client.id, None) is not None:
+            self.selector.unregister(client.connection.sock)
+            client.connection.close()
+            if client.flow_field is not None:
+                self.world.listeners.remove(client.flow_field)
+
+    def _handle(self, client, kind, body):
+        if kind == HELLO:
+            (version,) = HELLO_BODY.unpack_from(body)
+            if version != PROTOCOL_VERSION:
+                client.connection.close()
+                return
+            client.joined = True
+            if self.make_flow_field is not None and client.flow_field is None:
+                client.flow_field = self.make_flow_field()
+            mob_names = self.mob_manager.type_names if self.mob_manager else []
+            client.connection.send(encode_welcome(client.id, self.world.height, self.spawn_point,
+                                                  self.world.block_names, mob_names))
+        elif kind == POSITION and client.joined:
+            client.position = POSITION_BODY.unpack_from(body)
+        elif kind == EDITS and client.joined:
+            self.edits.append((client, decode_records(body, BLOCK_RECORD)[1]))
+
+    # Ticks
+
+    def tick(self, dt):
+        self.tick_number += 1
+        self._apply_edits()
+        if self.fluid_engine is not None:
+            self.fluid_engine.update(dt)
+        self._run_mobs(dt)
+        self._stream()
+        if self.storage is not None:
+            self.storage.update(dt, self.world)
+        self._broadcast()
+
+    def _apply_edits(self):
+        world = self.world
+        for client, records in self.edits:
+            corrections = []
+            for x, y, z, block in zip(records['x'].tolist(), records['y'].tolist(),
+                                      records['z'].tolist(), records['block'].tolist()):
+                if chunk_coords(x, z) not in client.known:
+                    continue
+                if block >= len(world.block_names) or not world.set_block(x, y, z, block):
+                    corrections.append(((x, y, z), world.get_block(x, y, z)))
+            if corrections:
+                client.connection.send(encode_records(BLOCKS, self.tick_number, block_records(corrections)))
+        self.edits = []
+
+    def _run_mobs(self, dt):
+        targets = [client for client in self.clients.values() if client.position is not None]
+        if self.mob_manager is None or not targets:
+            return
+        for client in targets:
+            if client.flow_field is not None:
+                client.flow_field.update(client.position)
+        damage, _ = self.mob_manager.update(dt, [client.position for client in targets], time.time(),
+                                            [client.flow_field for client in targets])
+        for client, amount in zip(targets, damage.tolist()):
+            if amount:
+                client.connection.send(frame(DAMAGE, DAMAGE_BODY.pack(amount)))
+
+    def _stream(self):
+        streamer = self.streamer
+        moved = False
+        for client in self.clients.values():
+            if client.position is None:
+                continue
+            center = chunk_coords(client.position[0], client.position[2])
+            if center != client.center:
+                moved = True
+                client.center = center
+                client.wanted = chunks_around(center, streamer.load_radius)
+                gone = [key for key in client.known if not in_radius(key, center, streamer.unload_radius)]
+                for key in gone:
+                    client.known.discard(key)
+                    client.connection.send(frame(UNLOAD, CHUNK_KEY.pack(*key)))
+        for _ in streamer.collect_steps():
+            pass
+        for client in self.clients.values():
+            sent = 0
+            for key in client.wanted:
+                if sent >= self.chunks_per_tick:
+                    break
+                if key in client.known:
+                    continue
+                chunk = self.world.chunks.get(key)
+                if chunk is None:
+                    streamer.request([key])
+                    continue
+                client.connection.send(encode_chunk(*key, chunk.blocks))
+                client.known.add(key)
+                sent += 1
+            client.wanted = [key for key in client.wanted if key not in client.known]
+        if moved:
+            streamer.unload()
+
+    def _needed(self, key):
+        return any(key in client.known or (client.center is not None
+                                           and in_radius(key, client.center, self.streamer.unload_radius))
+                   for client in self.clients.values())
+
+    def _broadcast(self):
+        joined = [client for client in self.clients.values() if client.joined]
+        if self.changes:
+            data = encode_records(BLOCKS, self.tick_number, block_records(list(self.changes.items())))
+            for client in joined:
+                client.connection.send(data)
+            self.changes.clear()
+        for key in self.resend:
+            chunk = self.world.chunks.get(key)
+            if chunk is None:
+                continue
+            data = encode_chunk(*key, chunk.blocks)
+            for client in joined:
+                if key in client.known:
+                    client.connection.send(data)
+        self.resend.clear()
+        manager = self.mob_manager
+        if manager is not None:
+            records = np.empty(manager.count, dtype=MOB_RECORD)
+            records['type'] = manager.types[:manager.count]
+            for axis, name in enumerate('xyz'):
+                records[name] = manager.positions[:manager.count, axis]
+            data = encode_records(MOBS, self.tick_number, records)
+            for client in joined:
+                client.connection.send(data)
+        for client in list(self.clients.values()):
+            client.connection.flush()
+            if client.connection.closed:
+                self._drop(client)
+
+    def serve_forever(self):
+        """Tick at tick_rate until stop(), reading clients in between."""
+        self.running = True
+        next_tick = time.monotonic()
+        last = next_tick
+        while self.running:
+            self.poll(max(0.0, next_tick - time.monotonic()))
+            now = time.monotonic()
+            if now < next_tick:
+                continue
+            self.tick(now - last)
+            last = now
+            next_tick += self.tick_interval
+            # After a stall, carry on from now instead of running the missed ticks back to back
+            if next_tick < now:
+                next_tick = now + self.tick_interval
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self._drop(client)
+        self.selector.close()
+        self.listener.close()
+        self.streamer.shutdown()
+        if self.storage is not None:
+            self.storage.save(self.world, background=False)
+            self.storage.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=int, default=1337)
+    parser.add_argument('--save', default='saves/voxelserver', help='directory for region files')
+    parser.add_argument('--tick-rate', type=int, default=20)
+    parser.add_argument('--load-radius', type=int, default=4, help='chunks sent around each client')
+    args = parser.parse_args(argv)
+
+    world = VoxelWorld(make_block_registry())
+    mob_manager = MobManager(MOB_TYPES)
+    rng = np.random.default_rng(args.seed)
+    for _ in range(5):
+        mob_manager.spawn(str(rng.choice(['zombie', 'skeleton', 'cow'])),
+                          (rng.uniform(-10, 10), 5, rng.uniform(-10, 10)))
+    server = VoxelServer(
+        world, ChunkGenerator(args.seed, world.block_ids, world.height),
+        args.host, args.port, storage=AutoSaver(WorldStorage(args.save, CHUNK_HEIGHT)),
+        tick_rate=args.tick_rate, load_radius=args.load_radius, unload_radius=args.load_radius + 2,
+        fluid_engine=FluidEngine(world), mob_manager=mob_manager,
+        make_flow_field=lambda: FlowField(world),
+    )
+    print(f"Serving on {server.address[0]}:{server.address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
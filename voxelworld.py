@@ -0,0 +1,737 @@
+from collections import namedtuple
+
+import numpy as np
+
+from blockregistry import AIR, BlockRegistry
+from palette import SECTION_HEIGHT, SECTION_WIDTH, ChunkCache, PaletteSection, unpack_rows
+
+# Chunk layout: block IDs live in a (x, y, z) uint8 array per 16x16xH column
+CHUNK_SIZE = 16
+CHUNK_HEIGHT = 64
+
+
+def chunk_coords(x, z):
+    return int(x) // CHUNK_SIZE, int(z) // CHUNK_SIZE
+
+
+def block_coords(position):
+    # Blocks are unit cubes centered on integer coordinates
+    return tuple(int(round(v)) for v in position)
+
+
+# Per horizontal neighbor of a chunk: its offset, this chunk's edge facing
+# it, the neighbor's edge facing back, and where that neighbor edge goes in
+# an array padded with a one-cell border
+_ALL, _INNER = slice(None), slice(1, -1)
+CHUNK_BORDERS = (
+    (-1, 0, (0, _ALL, _ALL), (-1, _ALL, _ALL), (0, _INNER, _INNER)),
+    (1, 0, (-1, _ALL, _ALL), (0, _ALL, _ALL), (-1, _INNER, _INNER)),
+    (0, -1, (_ALL, _ALL, 0), (_ALL, _ALL, -1), (_INNER, _INNER, 0)),
+    (0, 1, (_ALL, _ALL, -1), (_ALL, _ALL, 0), (_INNER, _INNER, -1)),
+)
+
+
+def pad_from_neighbors(padded, cx, cz, neighbor_array):
+    """Fill the side borders of a padded chunk array from its neighbors.
+
+    neighbor_array(key) gives the array of the chunk at key, or None to
+    leave that border as it is.
+    """
+    for dx, dz, _, facing, border in CHUNK_BORDERS:
+        array = neighbor_array((cx + dx, cz + dz))
+        if array is not None:
+            padded[border] = array[facing]
+
+
+def chunk_spans(x0, z0, width, depth):
+    """Split a column region into per-chunk pieces: (cx, cz, x range, z range) in chunk-local coordinates."""
+    for cx in range(x0 // CHUNK_SIZE, (x0 + width - 1) // CHUNK_SIZE + 1):
+        for cz in range(z0 // CHUNK_SIZE, (z0 + depth - 1) // CHUNK_SIZE + 1):
+            ox, oz = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+            yield (cx, cz,
+                   range(max(x0, ox) - ox, min(x0 + width, ox + CHUNK_SIZE) - ox),
+                   range(max(z0, oz) - oz, min(z0 + depth, oz + CHUNK_SIZE) - oz))
+
+
+class Chunk:
+    """A 16 x height x 16 column of blocks, stored as palette-compressed sections.
+
+    get() and set() work on the packed sections in O(1). blocks is a dense
+    uint8 array for bulk work: reading it expands the chunk, and that array
+    is the chunk's contents until compact() packs it again, which the
+    world's ChunkCache does for the least recently expanded chunks.
+
+    snapshot() gives a detached copy for saving in the background. The
+    sections are shared copy-on-write rather than copied.
+    """
+
+    def __init__(self, cx, cz, height=CHUNK_HEIGHT, cache=None):
+        if height % SECTION_HEIGHT:
+            raise ValueError(f"Chunk height must be a multiple of {SECTION_HEIGHT}, got {height}")
+        self.cx = cx
+        self.cz = cz
+        self.height = height
+        self.sections = [PaletteSection.uniform(AIR)] * (height // SECTION_HEIGHT)
+        self.dense = None
+        self.cache = cache
+        # Bit per section still shared with a snapshot, to copy before writing to it
+        self.shared = 0
+        # Edits not yet saved; mesh rebuilds are queued on the world instead
+        self.modified = False
+
+    @property
+    def blocks(self):
+        if self.dense is None:
+            self.dense = np.concatenate([section.unpack() for section in self.sections], axis=1)
+        if self.cache is not None:
+            self.cache.touch(self)
+        return self.dense
+
+    def rows(self, y0, y1):
+        """Blocks in rows y0 to y1 as a dense array, without expanding a packed chunk."""
+        if self.dense is not None:
+            return self.dense[:, y0:y1, :]
+        return unpack_rows(self.sections, y0, y1)
+
+    @blocks.setter
+    def blocks(self, blocks):
+        self.dense = np.array(blocks, dtype=np.uint8).reshape(CHUNK_SIZE, self.height, CHUNK_SIZE)
+        if self.cache is not None:
+            self.cache.touch(self)
+
+    def compact(self):
+        """Pack the dense array back into palette sections and drop it."""
+        if self.dense is None:
+            return
+        self.sections = [PaletteSection.pack(self.dense[:, y:y + SECTION_HEIGHT, :])
+                         for y in range(0, self.height, SECTION_HEIGHT)]
+        self.dense = None
+        self.shared = 0
+        if self.cache is not None:
+            self.cache.discard(self)
+
+    @property
+    def nbytes(self):
+        """Bytes of block storage currently held."""
+        if self.dense is not None:
+            return self.dense.nbytes
+        return sum(section.nbytes for section in self.sections)
+
+    def get(self, lx, y, lz):
+        if self.dense is not None:
+            return int(self.dense[lx, y, lz])
+        section = self.sections[y // SECTION_HEIGHT]
+        return section.get((lx * SECTION_HEIGHT + y % SECTION_HEIGHT) * SECTION_WIDTH + lz)
+
+    def set(self, lx, y, lz, block):
+        if self.dense is not None:
+            self.dense[lx, y, lz] = block
+            return
+        index = y // SECTION_HEIGHT
+        section = self.sections[index]
+        if section.is_uniform:
+            if section.palette[0] == block:
+                return
+            section = self.sections[index] = section.writable()
+        elif self.shared >> index & 1:
+            section = self.sections[index] = section.copy()
+            self.shared &= ~(1 << index)
+        section.set((lx * SECTION_HEIGHT + y % SECTION_HEIGHT) * SECTION_WIDTH + lz, block)
+
+    def snapshot(self):
+        """A copy of the chunk as it is now, safe to read from another thread; clears modified.
+
+        Packed sections are shared until the next write to each, so this
+        costs a list copy (or one array copy for an expanded chunk).
+        """
+        copy = Chunk(self.cx, self.cz, self.height)
+        if self.dense is not None:
+            copy.dense = self.dense.copy()
+        else:
+            copy.sections = list(self.sections)
+            self.shared = (1 << len(self.sections)) - 1
+        self.modified = False
+        return copy
+
+    @property
+    def origin(self):
+        return self.cx * CHUNK_SIZE, 0, self.cz * CHUNK_SIZE
+
+
+class VoxelWorld:
+    def __init__(self, block_names, height=CHUNK_HEIGHT, transparent_blocks=('water',),
+                 passable_blocks=('water',), dense_chunks=16):
+        # block_names is a BlockRegistry, or the names to build one from
+        if isinstance(block_names, BlockRegistry):
+            self.registry = block_names
+        else:
+            self.registry = BlockRegistry(block_names, transparent=transparent_blocks, passable=passable_blocks)
+        self.block_names = self.registry.names
+        self.block_ids = self.registry.ids
+        self.height = height
+        self.chunks = {}
+        # Chunks are kept palette-compressed, apart from the dense_chunks
+        # most recently used for bulk work such as meshing and lighting
+        self.chunk_cache = ChunkCache(dense_chunks)
+        # Remesh queues of chunk keys in insertion order; player edits go
+        # through the urgent queue ahead of streaming and worldgen work
+        self.dirty_urgent = {}
+        self.dirty_queued = {}
+        # Objects told about chunk and block changes, such as a LightEngine;
+        # each may define chunk_added, chunk_removed, chunk_changed and block_changed
+        self.listeners = []
+        # Faces next to transparent blocks stay visible when meshing; solid ones collide
+        self.transparent = self.registry.transparent
+        self.solid = self.registry.solid
+
+    def block_id(self, block):
+        return self.registry.block_id(block)
+
+    def _notify(self, event, *args):
+        for listener in self.listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+
+    def get_chunk(self, cx, cz, create=False):
+        chunk = self.chunks.get((cx, cz))
+        if chunk is None and create:
+            chunk = self.chunks[(cx, cz)] = Chunk(cx, cz, self.height, self.chunk_cache)
+            self.mark_dirty(cx, cz)
+            self._notify('chunk_added', chunk)
+        return chunk
+
+    def add_chunk(self, cx, cz, blocks):
+        chunk = self.chunks[(cx, cz)] = Chunk(cx, cz, self.height, self.chunk_cache)
+        chunk.blocks = blocks
+        self.mark_dirty(cx, cz)
+        self._mark_neighbors_dirty(cx, cz)
+        self._notify('chunk_added', chunk)
+        return chunk
+
+    def remove_chunk(self, cx, cz):
+        chunk = self.chunks.pop((cx, cz), None)
+        if chunk is not None:
+            self.chunk_cache.discard(chunk)
+            self.discard_dirty(cx, cz)
+            self._mark_neighbors_dirty(cx, cz)
+            self._notify('chunk_removed', chunk)
+        return chunk
+
+    def mark_dirty(self, cx, cz, urgent=False):
+        key = (cx, cz)
+        if key not in self.chunks or key in self.dirty_urgent:
+            return
+        if urgent:
+            self.dirty_queued.pop(key, None)
+            self.dirty_urgent[key] = True
+        else:
+            self.dirty_queued[key] = True
+
+    def discard_dirty(self, cx, cz):
+        self.dirty_urgent.pop((cx, cz), None)
+        self.dirty_queued.pop((cx, cz), None)
+
+    def pop_dirty(self):
+        """Next chunk waiting for a remesh, or None."""
+        for queue in (self.dirty_urgent, self.dirty_queued):
+            if queue:
+                key = next(iter(queue))
+                del queue[key]
+                return self.chunks[key]
+        return None
+
+    def _mark_neighbors_dirty(self, cx, cz, urgent=False):
+        for key in ((cx - 1, cz), (cx + 1, cz), (cx, cz - 1), (cx, cz + 1)):
+            self.mark_dirty(*key, urgent=urgent)
+
+    def is_loaded(self, x, z):
+        return chunk_coords(x, z) in self.chunks
+
+    def get_block(self, x, y, z):
+        if not 0 <= y < self.height:
+            return AIR
+        chunk = self.chunks.get(chunk_coords(x, z))
+        if chunk is None:
+            return AIR
+        return chunk.get(x % CHUNK_SIZE, y, z % CHUNK_SIZE)
+
+    def set_block(self, x, y, z, block):
+        """Change one block; returns False where the world has no loaded chunk to change.
+
+        An empty chunk made here would hide the real one until it streams
+        in, and leave a hole if it were then saved over it.
+        """
+        if not 0 <= y < self.height:
+            return False
+        block = self.block_id(block)
+        chunk = self.chunks.get(chunk_coords(x, z))
+        if chunk is None:
+            return False
+        lx, lz = x % CHUNK_SIZE, z % CHUNK_SIZE
+        old = chunk.get(lx, y, lz)
+        chunk.set(lx, y, lz, block)
+        chunk.modified = True
+        self.mark_dirty(chunk.cx, chunk.cz, urgent=True)
+        # Edits on a chunk border can expose or hide a face in the neighbor
+        for edge, dx, dz in ((lx == 0, -1, 0), (lx == CHUNK_SIZE - 1, 1, 0),
+                             (lz == 0, 0, -1), (lz == CHUNK_SIZE - 1, 0, 1)):
+            if edge:
+                self.mark_dirty(chunk.cx + dx, chunk.cz + dz, urgent=True)
+        if old != block:
+            self._notify('block_changed', x, y, z, old, block)
+        return True
+
+    def set_region(self, x0, y0, z0, blocks):
+        """Write a (x, y, z) array of block IDs with its minimum corner at (x0, y0, z0).
+
+        Like set_block, parts outside loaded chunks are dropped.
+        """
+        width, height, depth = blocks.shape
+        y1 = min(y0 + height, self.height)
+        for cx, cz, xs, zs in chunk_spans(x0, z0, width, depth):
+            chunk = self.chunks.get((cx, cz))
+            if chunk is None:
+                continue
+            ox, oz = cx * CHUNK_SIZE - x0, cz * CHUNK_SIZE - z0
+            chunk.blocks[xs.start:xs.stop, y0:y1, zs.start:zs.stop] = \
+                blocks[ox + xs.start:ox + xs.stop, :y1 - y0, oz + zs.start:oz + zs.stop]
+            chunk.modified = True
+            self.mark_dirty(cx, cz)
+            self._mark_neighbors_dirty(cx, cz)
+            self._notify('chunk_changed', chunk)
+
+    def edit(self, urgent=True):
+        """Start a bulk EditBatch that applies to this world when its with-block exits."""
+        return EditBatch(self.block_ids, self.height, world=self, urgent=urgent)
+
+    def block_type(self, x, y, z):
+        return self.block_names[self.get_block(x, y, z)]
+
+    def compact(self):
+        """Pack every expanded chunk back into palette sections, e.g. before measuring memory."""
+        self.chunk_cache.compact_all()
+
+    def dirty_chunks(self):
+        return [self.chunks[key] for queue in (self.dirty_urgent, self.dirty_queued) for key in queue]
+
+    def clear(self):
+        for chunk in self.chunks.values():
+            self._notify('chunk_removed', chunk)
+        self.chunks.clear()
+        self.chunk_cache.chunks.clear()
+        self.dirty_urgent.clear()
+        self.dirty_queued.clear()
+
+
+class EditBatch:
+    """Block changes collected per chunk and applied as one transaction.
+
+    Writes to the same position are deduplicated (the last one wins), and
+    applying the batch queues each touched chunk for a single remesh. A batch
+    can also be applied to a bare chunk array, which is how worldgen places
+    structures on worker processes.
+    """
+
+    def __init__(self, block_ids, height=CHUNK_HEIGHT, world=None, urgent=False):
+        self.block_ids = block_ids
+        self.height = height
+        self.world = world
+        self.urgent = urgent
+        # (cx, cz) -> (mask of written cells, values written)
+        self.chunks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.apply()
+
+    def __len__(self):
+        return sum(int(mask.sum()) for mask, _ in self.chunks.values())
+
+    def _block(self, block):
+        if block is None:
+            return AIR
+        if isinstance(block, str):
+            return self.block_ids[block]
+        return int(block)
+
+    def _layers(self, cx, cz):
+        layers = self.chunks.get((cx, cz))
+        if layers is None:
+            shape = (CHUNK_SIZE, self.height, CHUNK_SIZE)
+            layers = self.chunks[(cx, cz)] = (np.zeros(shape, dtype=bool), np.zeros(shape, dtype=np.uint8))
+        return layers
+
+    def set_block(self, x, y, z, block):
+        if 0 <= y < self.height:
+            mask, values = self._layers(x // CHUNK_SIZE, z // CHUNK_SIZE)
+            mask[x % CHUNK_SIZE, y, z % CHUNK_SIZE] = True
+            values[x % CHUNK_SIZE, y, z % CHUNK_SIZE] = self._block(block)
+
+    def _boxes(self, corner, other):
+        # Per-chunk local slices of the box between two inclusive corners
+        (x0, x1), (y0, y1), (z0, z1) = (sorted(pair) for pair in zip(corner, other))
+        y0, y1 = max(y0, 0), min(y1 + 1, self.height)
+        if y0 >= y1:
+            return
+        for cx, cz, xs, zs in chunk_spans(x0, z0, x1 - x0 + 1, z1 - z0 + 1):
+            yield cx, cz, (slice(xs.start, xs.stop), slice(y0, y1), slice(zs.start, zs.stop))
+
+    def fill_box(self, corner, other, block):
+        block = self._block(block)
+        for cx, cz, box in self._boxes(corner, other):
+            mask, values = self._layers(cx, cz)
+            mask[box] = True
+            values[box] = block
+
+    def replace(self, corner, other, old_block, new_block):
+        """Change every old_block inside the box (as it will be after this batch) to new_block."""
+        old_block, new_block = self._block(old_block), self._block(new_block)
+        for cx, cz, box in self._boxes(corner, other):
+            chunk = self.world.chunks.get((cx, cz)) if self.world else None
+            current = chunk.blocks[box] if chunk is not None else np.zeros_like(self._layers(cx, cz)[1][box])
+            if (cx, cz) in self.chunks:
+                mask, values = self.chunks[(cx, cz)]
+                current = np.where(mask[box], values[box], current)
+            hits = current == old_block
+            if hits.any():
+                mask, values = self._layers(cx, cz)
+                mask[box] |= hits
+                values[box] = np.where(hits, new_block, values[box])
+
+    def paste(self, x, y, z, structure, skip_air=True):
+        """Stamp a structure at (x, y, z): a list of (dx, dy, dz, block) or an (x, y, z) array of block IDs."""
+        if isinstance(structure, np.ndarray):
+            for dx, dy, dz in zip(*(np.nonzero(structure) if skip_air else np.indices(structure.shape).reshape(3, -1))):
+                self.set_block(x + int(dx), y + int(dy), z + int(dz), int(structure[dx, dy, dz]))
+            return
+        for dx, dy, dz, block in structure:
+            if block is not None or not skip_air:
+                self.set_block(x + dx, y + dy, z + dz, block)
+
+    def apply_to_chunk(self, blocks, cx, cz):
+        """Write this batch's changes for chunk (cx, cz) into a bare block array; returns the changed mask."""
+        layers = self.chunks.get((cx, cz))
+        if layers is None:
+            return None
+        mask, values = layers
+        changed = mask & (blocks != values)
+        blocks[changed] = values[changed]
+        return changed
+
+    def apply(self):
+        """Commit to the world, remeshing each touched chunk once; returns the number of blocks changed.
+
+        Changes to chunks that are not loaded are dropped, as set_block does.
+        """
+        world = self.world
+        total = 0
+        for (cx, cz), (mask, values) in self.chunks.items():
+            chunk = world.chunks.get((cx, cz))
+            if chunk is None:
+                continue
+            changed = self.apply_to_chunk(chunk.blocks, cx, cz)
+            if not changed.any():
+                continue
+            total += int(changed.sum())
+            chunk.modified = True
+            world.mark_dirty(cx, cz, urgent=self.urgent)
+            for edge, dx, dz in ((changed[0].any(), -1, 0), (changed[-1].any(), 1, 0),
+                                 (changed[:, :, 0].any(), 0, -1), (changed[:, :, -1].any(), 0, 1)):
+                if edge:
+                    world.mark_dirty(cx + dx, cz + dz, urgent=self.urgent)
+            world._notify('chunk_changed', chunk)
+        self.chunks.clear()
+        return total
+
+
+# Marks the layer below y=0 as solid so bottom faces are never emitted
+BELOW_WORLD = 255
+
+
+def padded_blocks(world, chunk):
+    """Chunk blocks with a one-cell border copied from the neighboring chunks."""
+    height = chunk.height
+    padded = np.zeros((CHUNK_SIZE + 2, height + 2, CHUNK_SIZE + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1, 1:-1] = chunk.blocks
+    padded[:, 0, :] = BELOW_WORLD
+
+    def neighbor_blocks(key):
+        neighbor = world.chunks.get(key)
+        return neighbor.blocks if neighbor is not None else None
+    pad_from_neighbors(padded, chunk.cx, chunk.cz, neighbor_blocks)
+    return padded
+
+
+def downsample_blocks(blocks, factor):
+    """Merge factor^3 cells into one for distant-chunk meshes.
+
+    A merged cell is solid when at least half of its cells are, and takes the
+    type of its highest solid cell so the surface color survives.
+    """
+    if factor == 1:
+        return blocks
+    w, h, d = blocks.shape
+    cells = blocks.reshape(w // factor, factor, h // factor, factor, d // factor, factor)
+    # Per merged cell, sub-cells ordered from the top layer down
+    cells = cells.transpose(0, 2, 4, 3, 1, 5)[:, :, :, ::-1].reshape(w // factor, h // factor, d // factor, -1)
+    filled = cells != AIR
+    top = np.take_along_axis(cells, filled.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+    solid = filled.sum(axis=-1) * 2 >= factor ** 3
+    return np.where(solid, top, AIR).astype(np.uint8)
+
+
+# Cube face table: normal, and the (u, v) axes that appear right/up when the
+# face is viewed from outside, so quads wind counter-clockwise on screen
+FACES = (
+    ((1, 0, 0), (0, 0, 1), (0, 1, 0)),
+    ((-1, 0, 0), (0, 0, -1), (0, 1, 0)),
+    ((0, 1, 0), (1, 0, 0), (0, 0, 1)),
+    ((0, -1, 0), (-1, 0, 0), (0, 0, 1)),
+    ((0, 0, 1), (-1, 0, 0), (0, 1, 0)),
+    ((0, 0, -1), (1, 0, 0), (0, 1, 0)),
+)
+QUAD_CORNERS = ((-1, -1), (1, -1), (1, 1), (-1, 1))
+MESH_MODES = ('naive', 'culled', 'greedy')
+
+# Light levels run 0-15; each level below full is 20% darker, down to a floor
+MAX_LIGHT = 15
+LIGHT_CURVE = np.maximum(0.15, 0.8 ** (MAX_LIGHT - np.arange(MAX_LIGHT + 1)))
+
+ChunkMesh = namedtuple('ChunkMesh', 'vertices triangles colors naive_triangles')
+
+
+def _axis(vector):
+    return next(i for i, c in enumerate(vector) if c)
+
+
+def _neighbors(padded, normal):
+    # The cell each block of a padded array faces along normal
+    dx, dy, dz = normal
+    return padded[1 + dx:padded.shape[0] - 1 + dx,
+                  1 + dy:padded.shape[1] - 1 + dy,
+                  1 + dz:padded.shape[2] - 1 + dz]
+
+
+def visible_faces(world, padded, normal):
+    """Block IDs of the faces pointing along normal that touch air or water, 0 elsewhere."""
+    blocks = padded[1:-1, 1:-1, 1:-1]
+    neighbors = _neighbors(padded, normal)
+    visible = world.transparent[neighbors] & (neighbors != blocks)
+    return np.where(visible, blocks, 0)
+
+
+def _greedy_rects(plane):
+    # Merge equal IDs into maximal rectangles, yielding (a, b, width, height, id)
+    cells = plane.tolist()
+    size_a, size_b = plane.shape
+    for a, b in zip(*np.nonzero(plane)):
+        a, b = int(a), int(b)
+        block = cells[a][b]
+        if not block:
+            continue
+        height = 1
+        while b + height < size_b and cells[a][b + height] == block:
+            height += 1
+        width = 1
+        while a + width < size_a and all(cells[a + width][b + k] == block for k in range(height)):
+            width += 1
+        for i in range(a, a + width):
+            cells[i][b:b + height] = [0] * height
+        yield a, b, width, height, block
+
+
+def _face_quads(faces, normal, u, v, greedy):
+    # Quads as rows of (cell x, y, z, extent along u axis, extent along v axis, id)
+    if not greedy:
+        xs, ys, zs = np.nonzero(faces)
+        ones = np.ones_like(xs)
+        return np.stack([xs, ys, zs, ones, ones, faces[xs, ys, zs]], axis=1)
+    d, ua, va = _axis(normal), _axis(u), _axis(v)
+    slices = np.moveaxis(faces, (d, ua, va), (0, 1, 2))
+    quads = []
+    for i in np.nonzero(slices.any(axis=(1, 2)))[0]:
+        for a, b, width, height, block in _greedy_rects(slices[i]):
+            cell = [0, 0, 0]
+            cell[d], cell[ua], cell[va] = int(i), a, b
+            quads.append(cell + [width, height, block])
+    return np.array(quads, dtype=np.int64).reshape(-1, 6)
+
+
+def _quad_vertices(quads, normal, u, v):
+    # Corner positions for quads spanning cells [start, start + extent) along u and v
+    normal, u, v = np.array(normal), np.array(u), np.array(v)
+    ua, va = _axis(u), _axis(v)
+    start = quads[:, :3].astype(np.float32) - 0.5 + 0.5 * (normal + 1) * np.abs(normal)
+    corners = []
+    for su, sv in QUAD_CORNERS:
+        corner = start.copy()
+        if su * u[ua] > 0:
+            corner[:, ua] += quads[:, 3]
+        if sv * v[va] > 0:
+            corner[:, va] += quads[:, 4]
+        corners.append(corner)
+    return np.stack(corners, axis=1).reshape(-1, 3)
+
+
+def _shaded_colors(block_colors, keys):
+    # keys are block ID + 256 * light level; each distinct pair is shaded once
+    shades = {}
+    for key in np.unique(keys).tolist():
+        color, brightness = block_colors[key & 0xFF], float(LIGHT_CURVE[key >> 8])
+        shades[key] = (color[0] * brightness, color[1] * brightness, color[2] * brightness, color[3])
+    return [shades[key] for key in keys.tolist()]
+
+
+def build_chunk_mesh(world, chunk, block_colors, mode='greedy', lod=1, light=None):
+    """Combine the blocks of a chunk into one vertex/triangle/color list in chunk-local space.
+
+    'naive' draws all six faces of every block, 'culled' only faces next to air
+    or water, and 'greedy' also merges coplanar faces of one block type into
+    larger quads. With lod 2 or 4 the chunk is first downsampled by that
+    factor; its border faces are kept as a skirt so coarse chunks never show
+    gaps against finer neighbors.
+
+    light is an optional padded light array (see LightEngine.padded_light).
+    Each face is shaded by the light of the cell it faces, and faces only
+    merge with neighbors that are lit the same. Coarse LOD meshes are unlit.
+    """
+    if mode not in MESH_MODES:
+        raise ValueError(f"Unknown mesh mode '{mode}'")
+    naive_triangles = 12 * int(np.count_nonzero(chunk.blocks))
+    blocks = downsample_blocks(chunk.blocks, lod)
+    if lod == 1:
+        padded = padded_blocks(world, chunk)
+    else:
+        padded = np.pad(blocks, 1)
+        padded[:, 0, :] = BELOW_WORLD
+    vertices, ids = [], []
+    for normal, u, v in FACES:
+        faces = blocks if mode == 'naive' else visible_faces(world, padded, normal)
+        if light is not None and lod == 1:
+            faces = np.where(faces, faces.astype(np.int32) + (_neighbors(light, normal).astype(np.int32) << 8), 0)
+        quads = _face_quads(faces, normal, u, v, greedy=mode == 'greedy')
+        if len(quads):
+            vertices.append(_quad_vertices(quads, normal, u, v))
+            ids.append(np.repeat(quads[:, 5], 4))
+    if not vertices:
+        return ChunkMesh([], [], [], naive_triangles)
+    vertices = np.concatenate(vertices)
+    if lod != 1:
+        vertices = (vertices + 0.5) * lod - 0.5
+    base = np.arange(0, len(vertices), 4)
+    triangles = np.stack([base, base + 1, base + 2, base, base + 2, base + 3], axis=1).ravel()
+    ids = np.concatenate(ids)
+    if light is not None and lod == 1:
+        colors = _shaded_colors(block_colors, ids)
+    else:
+        colors = [block_colors[i] for i in ids]
+    return ChunkMesh(vertices.tolist(), triangles.tolist(), colors, naive_triangles)
+
+
+def raycast_blocks(world, origin, direction, max_distance=5):
+    """Amanatides-Woo voxel traversal: first solid block along a ray.
+
+    Returns ((x, y, z), (nx, ny, nz)) for the hit block and the normal of the
+    face the ray entered through, or None. Cost depends only on the number of
+    cells crossed, not on the size of the world.
+    """
+    length = sum(d * d for d in direction) ** 0.5
+    if not length:
+        return None
+    direction = [d / length for d in direction]
+    # Blocks are centered on integers, so cell boundaries sit on half-integers
+    cell = [int(round(o)) for o in origin]
+    step, t_max, t_delta = [], [], []
+    for o, d, c in zip(origin, direction, cell):
+        if d > 0:
+            step.append(1)
+            t_max.append((c + 0.5 - o) / d)
+        elif d < 0:
+            step.append(-1)
+            t_max.append((c - 0.5 - o) / d)
+        else:
+            step.append(0)
+            t_max.append(float('inf'))
+        t_delta.append(abs(1 / d) if d else float('inf'))
+    normal = (0, 0, 0)
+    t = 0.0
+    while t <= max_distance:
+        if world.get_block(*cell) != AIR:
+            return tuple(cell), normal
+        axis = t_max.index(min(t_max))
+        t = t_max[axis]
+        cell[axis] += step[axis]
+        t_max[axis] += t_delta[axis]
+        normal = [0, 0, 0]
+        normal[axis] = -step[axis]
+        normal = tuple(normal)
+    return None
+
+
+# Keeps resolved boxes from resting exactly on a cell boundary
+COLLISION_EPSILON = 1e-4
+
+
+def _cells_spanned(low, high):
+    # Indices of the unit cells (centered on integers) that overlap (low, high)
+    return range(int(np.floor(low + 0.5 + COLLISION_EPSILON)), int(np.floor(high + 0.5 - COLLISION_EPSILON)) + 1)
+
+
+def _box_bounds(position, half_width, height):
+    x, y, z = position
+    return (x - half_width, y, z - half_width), (x + half_width, y + height, z + half_width)
+
+
+def solid_cells(world, position, half_width, height, unloaded_solid=True):
+    """Solid cells overlapping an upright box standing at position (its feet)."""
+    low, high = _box_bounds(position, half_width, height)
+    cells = []
+    for x in _cells_spanned(low[0], high[0]):
+        for z in _cells_spanned(low[2], high[2]):
+            if unloaded_solid and not world.is_loaded(x, z):
+                cells.extend((x, y, z) for y in _cells_spanned(low[1], high[1]))
+                continue
+            for y in _cells_spanned(low[1], high[1]):
+                if world.solid[world.get_block(x, y, z)]:
+                    cells.append((x, y, z))
+    return cells
+
+
+def move_box(world, position, delta, half_width=0.3, height=1.8, unloaded_solid=True):
+    """Move an upright box through the block grid one axis at a time.
+
+    Returns (position, blocked, grounded): blocked flags the axes whose motion
+    was stopped by a solid block, grounded whether the box rests on one.
+    Columns of unloaded chunks count as solid so nothing falls out of the world
+    before its terrain arrives. Cells the box already overlaps at the start
+    are ignored, so a box inside solid blocks (or an unloaded chunk) stays
+    put or walks out rather than being thrown clear of them.
+    """
+    position = list(position)
+    embedded = set(solid_cells(world, position, half_width, height, unloaded_solid))
+    blocked = [False, False, False]
+    extents = ((-half_width, half_width), (0, height), (-half_width, half_width))
+    for axis in (1, 0, 2):
+        distance = delta[axis]
+        # Sub-steps shorter than a block so fast falls cannot tunnel
+        steps = int(abs(distance) // 0.5) + 1
+        for _ in range(steps):
+            if blocked[axis]:
+                break
+            position[axis] += distance / steps
+            cells = [cell for cell in solid_cells(world, position, half_width, height, unloaded_solid)
+                     if cell not in embedded]
+            if not cells:
+                continue
+            blocked[axis] = True
+            if distance > 0:
+                position[axis] = min(c[axis] for c in cells) - 0.5 - extents[axis][1] - COLLISION_EPSILON
+            else:
+                position[axis] = max(c[axis] for c in cells) + 0.5 - extents[axis][0] + COLLISION_EPSILON
+    below = (position[0], position[1] - 0.01, position[2])
+    grounded = bool(solid_cells(world, below, half_width, height, unloaded_solid))
+    return tuple(position), tuple(blocked), grounded
@@ -0,0 +1,249 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from voxelworld import CHUNK_SIZE, EditBatch, chunk_spans
+
+# Biome codes stored in biome arrays
+DESERT = 0
+PLAINS = 1
+FOREST = 2
+BIOME_NAMES = ('desert', 'plains', 'forest')
+
+# Classic 2D Perlin gradient set
+GRADIENTS = np.array([(1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.float64)
+
+
+def _fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+class PerlinNoise2D:
+    """Seeded 2D Perlin noise evaluated over whole NumPy arrays, roughly in [-1, 1]."""
+
+    def __init__(self, seed=0):
+        perm = np.random.default_rng(seed).permutation(256)
+        self.perm = np.concatenate([perm, perm])
+
+    def __call__(self, x, z):
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        x_floor, z_floor = np.floor(x), np.floor(z)
+        xf, zf = x - x_floor, z - z_floor
+        xi = x_floor.astype(np.int64) & 255
+        zi = z_floor.astype(np.int64) & 255
+        perm = self.perm
+
+        def corner(dx, dz):
+            gradient = GRADIENTS[perm[perm[xi + dx] + zi + dz] & 7]
+            return gradient[..., 0] * (xf - dx) + gradient[..., 1] * (zf - dz)
+
+        u, v = _fade(xf), _fade(zf)
+        bottom = corner(0, 0) + u * (corner(1, 0) - corner(0, 0))
+        top = corner(0, 1) + u * (corner(1, 1) - corner(0, 1))
+        return bottom + v * (top - bottom)
+
+
+def column_grid(x0, z0, width, depth):
+    # World (x, z) coordinates of a region, indexed [x - x0, z - z0] like chunk arrays
+    return np.meshgrid(np.arange(x0, x0 + width), np.arange(z0, z0 + depth), indexing='ij')
+
+
+class TerrainNoise:
+    def __init__(self, seed=0, height_scale=0.1, biome_scale=0.05):
+        self.seed = seed
+        self.height_scale = height_scale
+        self.biome_scale = biome_scale
+        self.height_noise = PerlinNoise2D(seed)
+        self.biome_noise = PerlinNoise2D(seed + 1)
+
+    def height_field(self, x0, z0, width, depth, amplitude=10):
+        xs, zs = column_grid(x0, z0, width, depth)
+        noise = self.height_noise(xs * self.height_scale, zs * self.height_scale)
+        return ((noise + 1) * amplitude).astype(np.int64)
+
+    def biome_field(self, x0, z0, width, depth):
+        xs, zs = column_grid(x0, z0, width, depth)
+        value = self.biome_noise(xs * self.biome_scale, zs * self.biome_scale)
+        return np.where(value < -0.2, DESERT, np.where(value < 0.2, PLAINS, FOREST)).astype(np.uint8)
+
+    def biome_heights(self, x0, z0, biomes):
+        """Heights for a region whose biome codes are known; deserts are half as tall."""
+        width, depth = biomes.shape
+        xs, zs = column_grid(x0, z0, width, depth)
+        noise = self.height_noise(xs * self.height_scale, zs * self.height_scale)
+        amplitude = np.where(biomes == DESERT, 5, 10)
+        return ((noise + 1) * amplitude).astype(np.int64)
+
+    def height_and_biome(self, x0, z0, width, depth):
+        biomes = self.biome_field(x0, z0, width, depth)
+        return self.biome_heights(x0, z0, biomes), biomes
+
+
+class BiomeService:
+    """Biome lookups for one world seed, cached per chunk with LRU eviction."""
+
+    def __init__(self, terrain_noise, max_chunks=1024):
+        self.terrain_noise = terrain_noise
+        self.max_chunks = max_chunks
+        self._chunks = OrderedDict()
+
+    def chunk_biomes(self, cx, cz):
+        key = (cx, cz)
+        biomes = self._chunks.get(key)
+        if biomes is None:
+            biomes = self.terrain_noise.biome_field(cx * CHUNK_SIZE, cz * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+            self._chunks[key] = biomes
+            if len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return biomes
+
+    def biome_code(self, x, z):
+        x, z = int(x), int(z)
+        biomes = self.chunk_biomes(x // CHUNK_SIZE, z // CHUNK_SIZE)
+        return int(biomes[x % CHUNK_SIZE, z % CHUNK_SIZE])
+
+    def biome_at(self, x, z):
+        return BIOME_NAMES[self.biome_code(x, z)]
+
+    def region(self, x0, z0, width, depth):
+        """Biome codes for a region, assembled from cached chunks."""
+        biomes = np.empty((width, depth), dtype=np.uint8)
+        for cx, cz, xs, zs in chunk_spans(x0, z0, width, depth):
+            ox, oz = cx * CHUNK_SIZE - x0, cz * CHUNK_SIZE - z0
+            biomes[ox + xs.start:ox + xs.stop, oz + zs.start:oz + zs.stop] = \
+                self.chunk_biomes(cx, cz)[xs.start:xs.stop, zs.start:zs.stop]
+        return biomes
+
+
+def layer_columns(heights, biomes, block_ids, height):
+    """Fill columns up to their heights: sand over stone in deserts, grass over 3 dirt over stone elsewhere."""
+    heights = np.minimum(heights, height - 1)[:, None, :]
+    desert = (biomes == DESERT)[:, None, :]
+    y = np.arange(height)[None, :, None]
+    blocks = np.where(y < heights, block_ids['stone'], 0)
+    blocks = np.where((y < heights) & (y >= heights - 3) & ~desert, block_ids['dirt'], blocks)
+    top = np.where(desert, block_ids.get('sand', block_ids['grass']), block_ids['grass'])
+    blocks = np.where(y == heights, top, blocks)
+    return blocks.astype(np.uint8)
+
+
+def column_random(seed, xs, zs, salt=0):
+    """Deterministic per-column random floats in [0, 1) from a position hash."""
+    with np.errstate(over='ignore'):
+        h = np.asarray(xs, dtype=np.int64).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        h ^= np.asarray(zs, dtype=np.int64).astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+        h ^= np.uint64((seed * 0x632BE59BD9B4E019 + salt) & 0xFFFFFFFFFFFFFFFF)
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+# Structures as (dx, dy, dz, block) offsets from the surface block of their column
+def house_structure():
+    blocks = []
+    for dx in range(3):
+        for dz in range(3):
+            blocks.append((dx, 1, dz, 'wood'))
+            if dx == 0 or dx == 2 or dz == 0 or dz == 2:
+                blocks.append((dx, 2, dz, 'cobblestone'))
+    return blocks
+
+
+def tree_structure(tree_height):
+    blocks = [(0, 1 + ty, 0, 'wood') for ty in range(tree_height)]
+    for lx in range(-1, 2):
+        for lz in range(-1, 2):
+            for ly in range(tree_height - 1, tree_height + 1):
+                blocks.append((lx, 1 + ly, lz, 'leaves'))
+    return blocks
+
+
+# Structures reach at most this many columns outside the column they start in
+STRUCTURE_MARGIN = 2
+
+_biome_services = {}
+
+
+def _biome_service(seed):
+    # Worker processes keep one noise engine and biome cache per seed between
+    # chunks, so the margin columns neighbors share are worked out only once
+    service = _biome_services.get(seed)
+    if service is None:
+        service = _biome_services[seed] = BiomeService(TerrainNoise(seed))
+    return service
+
+
+def generate_chunk_blocks(seed, cx, cz, block_ids, height, biome=None, structures=True):
+    """Block array for one chunk, including structures that spill over from neighbor columns.
+
+    Pure function of its arguments, so chunks can be generated in any order and
+    on any process. Pass biome to force a single biome everywhere.
+    """
+    service = _biome_service(seed)
+    noise = service.terrain_noise
+    margin = STRUCTURE_MARGIN if structures else 0
+    size = CHUNK_SIZE + 2 * margin
+    x0, z0 = cx * CHUNK_SIZE - margin, cz * CHUNK_SIZE - margin
+    if biome is None:
+        biomes = service.region(x0, z0, size, size)
+    else:
+        biomes = np.full((size, size), biome, dtype=np.uint8)
+    heights = noise.biome_heights(x0, z0, biomes)
+    inner = slice(margin, margin + CHUNK_SIZE)
+    blocks = layer_columns(heights[inner, inner], biomes[inner, inner], block_ids, height)
+    if not structures:
+        return blocks
+    xs, zs = column_grid(x0, z0, size, size)
+    rolls = column_random(seed, xs, zs)
+    tree_heights = 3 + (column_random(seed, xs, zs, salt=1) * 3).astype(np.int64)
+    placements = [(ix, iz, house_structure()) for ix, iz in np.argwhere((biomes == PLAINS) & (rolls < 0.01))]
+    placements += [(ix, iz, tree_structure(tree_heights[ix, iz]))
+                   for ix, iz in np.argwhere((biomes == FOREST) & (rolls < 0.1))]
+    batch = EditBatch(block_ids, height)
+    for ix, iz, structure in placements:
+        batch.paste(x0 + int(ix), int(heights[ix, iz]), z0 + int(iz), structure)
+    batch.apply_to_chunk(blocks, cx, cz)
+    return blocks
+
+
+class ChunkGenerator:
+    """Picklable generate(cx, cz) for one world, suitable for worker processes."""
+
+    def __init__(self, seed, block_ids, height, biome=None, structures=True):
+        self.seed = seed
+        self.block_ids = dict(block_ids)
+        self.height = height
+        self.biome = biome
+        self.structures = structures
+
+    def __call__(self, cx, cz):
+        return generate_chunk_blocks(self.seed, cx, cz, self.block_ids, self.height,
+                                     self.biome, self.structures)
+
+
+def generate_end_blocks(seed, cx, cz, block_ids, height, island_radius=10):
+    """Block array for one End chunk: scattered end stone pillars around an obsidian portal frame."""
+    blocks = np.zeros((CHUNK_SIZE, height, CHUNK_SIZE), dtype=np.uint8)
+    x0, z0 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+    xs, zs = column_grid(x0, z0, CHUNK_SIZE, CHUNK_SIZE)
+    island = (xs >= -island_radius) & (xs < island_radius) & (zs >= -island_radius) & (zs < island_radius)
+    pillars = island & (column_random(seed, xs, zs, salt=2) < 0.1)
+    pillar_heights = np.where(pillars, 1 + (column_random(seed, xs, zs, salt=3) * 5).astype(np.int64), 0)
+    y = np.arange(height)[None, :, None]
+    blocks[y < pillar_heights[:, None, :]] = block_ids['end_stone']
+    # End Portal frame
+    batch = EditBatch(block_ids, height)
+    batch.fill_box((-1, 0, -1), (1, 0, 1), 'obsidian')
+    batch.apply_to_chunk(blocks, cx, cz)
+    return blocks
+
+
+class EndChunkGenerator(ChunkGenerator):
+    def __call__(self, cx, cz):
+        return generate_end_blocks(self.seed, cx, cz, self.block_ids, self.height)